@@ -3,24 +3,42 @@ from __future__ import annotations
 from collections.abc import Callable
 from dataclasses import dataclass
 import logging
+from time import time
 
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError, ServiceValidationError
 from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers import entity_platform
+import homeassistant.helpers.config_validation as cv
 
 from .const import DOMAIN
+from .api import CONNECTION_ERRORS, APIAuthError, APIConnectionError
+from .capture import CAPTURE_SIZE
+from .history import HISTORY_FIELDS, RATE_FIELDS
 from .coordinator import HyperboxCoordinator
+from .transport import async_release_transport
 
 _LOGGER = logging.getLogger(__name__)
 
-#PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR, Platform.BUTTON]
-#disabled due to stability issues
-PLATFORMS: list[Platform] = [Platform.BUTTON]
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR, Platform.BUTTON]
+
+# config entry of the router a service call is for, optional while only one is set up
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+SERVICE_SEND_SMS = "send_sms"
+SERVICES = (
+    SERVICE_SEND_SMS,
+    "get_sms_messages",
+    "get_cell_history",
+    "delete_sms",
+    "mark_sms_read",
+    "get_history",
+    "call_ubus",
+    "capture_traffic",
+)
 
 @dataclass
 class RuntimeData:
@@ -38,15 +56,35 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     # Initialise the coordinator that manages data updates from your api.
     # This is defined in coordinator.py
     coordinator = HyperboxCoordinator(hass, config_entry)
+    try:
+        await coordinator.inbox.async_load()
+        await coordinator.outbox.async_load()
+
+        if await coordinator.async_restore():
+            # Entities come up with the values saved by the last run and the first
+            # poll runs in the background, so startup does not wait for the router.
+            config_entry.async_create_background_task(
+                hass, coordinator.async_request_refresh(), f"{DOMAIN} first refresh {coordinator.hostname}"
+            )
+        else:
+            # Perform an initial data load from api.
+            # async_config_entry_first_refresh() is special in that it does not log errors if it fails
+            await coordinator.async_config_entry_first_refresh()
 
-    # Perform an initial data load from api.
-    # async_config_entry_first_refresh() is special in that it does not log errors if it fails
-    await coordinator.async_config_entry_first_refresh()
+            # Test to see if api initialised correctly, else raise ConfigNotReady to make HA retry setup
+            # TODO: Change this to match how your api will know if connected or successful update
+            if not coordinator.api.connected:
+                raise ConfigEntryNotReady
+    except Exception:
+        # async_unload_entry does not run for a failed setup, so the coordinator's
+        # use of the shared transport is released here
+        await async_release_transport(hass, coordinator.hostname)
+        raise
 
-    # Test to see if api initialised correctly, else raise ConfigNotReady to make HA retry setup
-    # TODO: Change this to match how your api will know if connected or successful update
-    if not coordinator.api.connected:
-        raise ConfigEntryNotReady
+    # The cell tracker compares network info on every poll, and the SMS events, inbox store and
+    # router pruning need the listing, even with all their sensors disabled
+    config_entry.async_on_unload(coordinator.async_add_consumer("network_info"))
+    config_entry.async_on_unload(coordinator.async_add_consumer("sms_messages"))
 
     # Initialise a listener for config flow options changes.
     # See config_flow for defining an options setting that shows up as configure on the integration.
@@ -61,23 +99,207 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     # This calls the async_setup method in each of your entity type files.
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
-    # Setup services
-    async def service_send_message(call: ServiceCall):
-        """Search in the date range and return the matching items."""
-        await coordinator.sendMessage(call.data["address"], call.data["content"])
+    # Send queued messages in the background, the task is cancelled on unload
+    config_entry.async_create_background_task(
+        hass, coordinator.outbox.async_run(), f"{DOMAIN} sms outbox {coordinator.hostname}"
+    )
+
+    # Services are shared by all routers, the call picks the router
+    if not hass.services.has_service(DOMAIN, SERVICE_SEND_SMS):
+        _async_register_services(hass)
+
+    # Return true to denote a successful setup.
+    return True
+
+
+def _coordinator(hass: HomeAssistant, call: ServiceCall) -> HyperboxCoordinator:
+    """Return the coordinator of the router a service call is for."""
+    entries: dict[str, RuntimeData] = hass.data.get(DOMAIN, {})
+    entry_id = call.data.get(ATTR_CONFIG_ENTRY_ID)
+    if entry_id is None:
+        if len(entries) != 1:
+            raise ServiceValidationError(f"{len(entries)} routers are set up, select one with {ATTR_CONFIG_ENTRY_ID}")
+        return next(iter(entries.values())).coordinator
+    if entry_id not in entries:
+        raise ServiceValidationError(f"No router is loaded for config entry {entry_id}")
+    return entries[entry_id].coordinator
+
+
+def _schema(fields: dict = None) -> vol.Schema:
+    return vol.Schema({vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string, **(fields or {})})
+
+
+def _message_selection(call: ServiceCall) -> dict:
+    selection = {key: call.data[key] for key in ("ids", "number") if key in call.data}
+    if "older_than" in call.data:
+        selection["older_than"] = call.data["older_than"] * 86400
+    return selection
+
+
+MESSAGE_SELECTION_FIELDS = {
+    vol.Optional("ids"): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional("older_than"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional("number"): cv.string,
+}
+
+
+def _async_register_services(hass: HomeAssistant) -> None:
+    async def service_send_message(call: ServiceCall) -> ServiceResponse:
+        """Queue a message for one or more numbers."""
+        ids = _coordinator(hass, call).sendMessage(call.data["address"], call.data["content"])
+        if call.return_response:
+            return {"ids": ids}
+        return None
 
     hass.services.async_register(
         DOMAIN,
-        "send_sms",
+        SERVICE_SEND_SMS,
         service_send_message,
-        schema=vol.Schema({
-            vol.Required("address"): str,
+        schema=_schema({
+            vol.Required("address"): vol.All(cv.ensure_list, [str]),
             vol.Required("content"): str,
         }),
+        supports_response=SupportsResponse.OPTIONAL,
     )
 
-    # Return true to denote a successful setup.
-    return True
+    async def service_get_messages(call: ServiceCall) -> ServiceResponse:
+        """Return one page of the received messages, newest first."""
+        coordinator = _coordinator(hass, call)
+        return {
+            "total": len(coordinator.inbox),
+            "messages": coordinator.inbox.page(call.data["page"], call.data["page_size"]),
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        "get_sms_messages",
+        service_get_messages,
+        schema=_schema({
+            vol.Optional("page", default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional("page_size", default=20): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        }),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def service_get_cell_history(call: ServiceCall) -> ServiceResponse:
+        """Return the recently used cells, newest first."""
+        coordinator = _coordinator(hass, call)
+        return {
+            "host": coordinator.hostname,
+            "cells": coordinator.cells.history(),
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        "get_cell_history",
+        service_get_cell_history,
+        schema=_schema(),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def service_delete_messages(call: ServiceCall) -> ServiceResponse:
+        """Delete the messages on the router that match all given filters."""
+        ids = await _coordinator(hass, call).deleteMessages(**_message_selection(call), read=call.data.get("read"))
+        if call.return_response:
+            return {"ids": ids}
+        return None
+
+    hass.services.async_register(
+        DOMAIN,
+        "delete_sms",
+        service_delete_messages,
+        schema=vol.All(
+            _schema({**MESSAGE_SELECTION_FIELDS, vol.Optional("read"): cv.boolean}),
+            # never delete the whole inbox by accident
+            cv.has_at_least_one_key("ids", "older_than", "number", "read"),
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def service_mark_messages_read(call: ServiceCall) -> ServiceResponse:
+        """Mark the unread messages on the router that match all given filters as read."""
+        ids = await _coordinator(hass, call).markMessagesRead(**_message_selection(call))
+        if call.return_response:
+            return {"ids": ids}
+        return None
+
+    hass.services.async_register(
+        DOMAIN,
+        "mark_sms_read",
+        service_mark_messages_read,
+        schema=_schema(MESSAGE_SELECTION_FIELDS),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def service_get_history(call: ServiceCall) -> ServiceResponse:
+        """Return the recent samples of the throughput and signal fields, oldest first."""
+        coordinator = _coordinator(hass, call)
+        history = coordinator.history
+        since = time() - call.data["window"] if "window" in call.data else None
+        return {
+            "host": coordinator.hostname,
+            "fields": {
+                name: [[timestamp, value] for timestamp, value in history.samples(name, since)]
+                for name in call.data.get("fields") or history.fields
+            },
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        "get_history",
+        service_get_history,
+        schema=_schema({
+            vol.Optional("fields"): vol.All(cv.ensure_list, [vol.In((*HISTORY_FIELDS, *RATE_FIELDS))]),
+            vol.Optional("window"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        }),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def service_call_ubus(call: ServiceCall) -> ServiceResponse:
+        """Call a ubus method of the router and return its result."""
+        coordinator = _coordinator(hass, call)
+        endpoint, method = call.data["endpoint"], call.data["method"]
+        if not coordinator.ubusAllowed(endpoint, method):
+            raise ServiceValidationError(f"{endpoint}.{method} is not allowed by the ubus allowlist and denylist options")
+        try:
+            result = await coordinator.callUbus(endpoint, method, call.data["params"], call.data["max_age"])
+        except (APIAuthError, APIConnectionError, *CONNECTION_ERRORS) as err:
+            raise HomeAssistantError(f"Calling {endpoint}.{method} failed: {err}") from err
+        return {"result": result}
+
+    hass.services.async_register(
+        DOMAIN,
+        "call_ubus",
+        service_call_ubus,
+        schema=_schema({
+            vol.Required("endpoint"): cv.string,
+            vol.Required("method"): cv.string,
+            vol.Optional("params", default={}): dict,
+            vol.Optional("max_age", default=10): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+        }),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def service_capture_traffic(call: ServiceCall) -> ServiceResponse:
+        """Record the calls to the router with secrets and phone numbers redacted and write them to a file."""
+        coordinator = _coordinator(hass, call)
+        if coordinator.api.capture is not None:
+            raise ServiceValidationError(f"A capture of {coordinator.hostname} is already running")
+        path = await coordinator.captureTraffic(call.data["calls"], call.data["duration"])
+        if call.return_response:
+            return {"path": path, "calls": len(coordinator.last_capture["calls"])}
+        return None
+
+    hass.services.async_register(
+        DOMAIN,
+        "capture_traffic",
+        service_capture_traffic,
+        schema=_schema({
+            vol.Optional("calls", default=CAPTURE_SIZE): vol.All(vol.Coerce(int), vol.Range(min=1, max=5000)),
+            vol.Optional("duration", default=600): vol.All(vol.Coerce(float), vol.Range(min=1, max=86400)),
+        }),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
 
 
 async def _async_update_listener(hass: HomeAssistant, config_entry):
@@ -101,7 +323,12 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
 
     # Remove the config entry from the hass data object.
     if unload_ok:
-        hass.data[DOMAIN].pop(config_entry.entry_id)
+        runtime_data = hass.data[DOMAIN].pop(config_entry.entry_id)
+        await async_release_transport(hass, runtime_data.coordinator.hostname)
+        if not hass.data[DOMAIN]:
+            # the last router is gone
+            for service in SERVICES:
+                hass.services.async_remove(DOMAIN, service)
 
     # Return that unloading was successful.
     return unload_ok
@@ -3,86 +3,321 @@ import logging
 from random import choice, randrange
 
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from aiohttp import ClientError, ClientResponseError, ClientSession, BasicAuth
+from aiohttp import ClientError, ClientResponseError, ClientSession, ClientTimeout, BasicAuth
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.json import json_bytes
+from homeassistant.util.json import json_loads
 
-import json
+import asyncio
 import hashlib
+from itertools import count
 from datetime import datetime, timedelta, timezone
+from time import monotonic
 from pygsm7 import encodeMessage, decodeMessage
 
+from .breaker import CircuitBreaker, CircuitState
+from .capture import TrafficCapture
+from .const import DEFAULT_SESSION_LIFETIME
+from .metrics import APIMetrics
+from .pipeline import RequestGate, RequestPriority
+
 _LOGGER = logging.getLogger(__name__)
 
+# ubus status code returned when the session is not allowed to call a method
+UBUS_STATUS_PERMISSION_DENIED = 6
+# session id used for calls that do not need a login
+ANONYMOUS_SESSION = "00000000000000000000000000000000"
+# requests sent to the router at the same time, enough for the endpoints of
+# a poll to be fetched side by side when the batch times out
+MAX_CONCURRENT_REQUESTS = 3
+# an unreachable router fails after a few seconds instead of the aiohttp default of five minutes
+REQUEST_TIMEOUT = ClientTimeout(total=15, sock_connect=5)
+PROBE_TIMEOUT = ClientTimeout(total=5)
+# seconds after a reboot command before the router is probed, it keeps answering for a moment
+REBOOT_GRACE = 10
+# errors that mean the router did not answer
+CONNECTION_ERRORS = (ClientError, TimeoutError, OSError)
+
+LOGIN_INFO_CALL = ("zwrt_web", "web_login_info", {})
+
+WAN_STATISTICS_CALL = ("zwrt_data", "get_wwandst", {
+    "source_module": "web",
+    "cid": 1,
+    "type": 4
+})
+NETWORK_INFO_CALL = ("zte_nwinfo_api", "nwinfo_get_netinfo", {})
+# messages fetched per page while syncing the inbox, newest first
+SMS_PAGE_SIZE = 50
+# every this many syncs the whole inbox is listed to drop messages deleted on the router
+SMS_FULL_SYNC_INTERVAL = 30
+
+def _smsPageCall(page: int):
+    return ("zwrt_wms", "zte_libwms_get_sms_data", {
+        "page": page,
+        "data_per_page": SMS_PAGE_SIZE,
+        "mem_store": 1,
+        "tags": 10,
+        "order_by": "order by id desc"
+    })
+
+SMS_MESSAGES_CALL = _smsPageCall(0)
+
+# message ids deleted or marked read per call
+SMS_ID_CHUNK_SIZE = 50
+# tags of the messages in the inbox listing
+SMS_TAG_READ = '0'
+SMS_TAG_UNREAD = '1'
+SMS_TAG_SENT = '2'
+
+def _smsIdChunks(ids: list[str]):
+    # the router takes ids as a semicolon terminated list
+    for start in range(0, len(ids), SMS_ID_CHUNK_SIZE):
+        yield "".join(f"{id};" for id in ids[start:start + SMS_ID_CHUNK_SIZE])
+
+# calls fetched on every poll, by the name of the data they provide
+POLL_CALLS = {
+    "network_statistics": WAN_STATISTICS_CALL,
+    "network_info": NETWORK_INFO_CALL,
+    "sms_messages": SMS_MESSAGES_CALL,
+}
+POLL_ENDPOINTS = tuple(POLL_CALLS)
+
+def _serializeCall(endpoint, method, params) -> bytes:
+    """Serialize the part of a JSON-RPC call object that follows the session."""
+    return b"," + json_bytes(endpoint) + b"," + json_bytes(method) + b"," + json_bytes(params) + b"]}"
+
+# serialized calls with fixed parameters by the id of their params, the
+# params are kept to make sure the id still belongs to them
+_CALL_TEMPLATES = {
+    id(params): (params, _serializeCall(endpoint, method, params))
+    for endpoint, method, params in (WAN_STATISTICS_CALL, NETWORK_INFO_CALL, SMS_MESSAGES_CALL)
+}
+
 class API:
-    def __init__(self, hass: HomeAssistant, hostname: str) -> None:
-        """Initialise."""
+    def __init__(self, hass: HomeAssistant, hostname: str, password: str = None, session_lifetime: int = DEFAULT_SESSION_LIFETIME, session: ClientSession = None, gate: RequestGate = None) -> None:
+        """Initialise.
+
+        Requests go through the given session and gate when they are shared
+        with other routers, otherwise through Home Assistant's session.
+        """
         self._url = "http://" + hostname + "/"
-        self._session = async_get_clientsession(hass)
-        self._req_id = 0
+        self._session = session if session is not None else async_get_clientsession(hass)
+        self._password = password
+        self._session_lifetime = session_lifetime
+        self._req_ids = count()
+        # every request passes this router's gate and the one shared with other routers, logins are single-flight behind the lock
+        self.gate = RequestGate(MAX_CONCURRENT_REQUESTS)
+        self.shared_gate = gate if gate is not None else RequestGate(MAX_CONCURRENT_REQUESTS)
+        self._login_lock = asyncio.Lock()
+        self.metrics = APIMetrics()
+        self.breaker = CircuitBreaker(hostname)
+        self._probe_lock = asyncio.Lock()
+        # records the calls and replies while set, until it is full
+        self.capture: TrafficCapture = None
+        # decoded SMS messages by id and the highest id seen so far
+        self._sms_cache: dict[str, dict] = {}
+        self._sms_max_id = -1
+        self._sms_syncs = 0
         self._resetSession()
 
     def _resetSession(self):
         self.connected: bool = False
-        self._ubus_rpc_session = "00000000000000000000000000000000"
-
-    async def sendRequest(self, endpoint, method, params = {}):
-        payload = [
-            {
-                "jsonrpc": "2.0",
-                "id": self._req_id,
-                "method": "call",
-                "params": [
-                    self._ubus_rpc_session,
-                    endpoint,
-                    method,
-                    params
-                ]
-            }
-        ]
-        response = await self._session.post(self._url + "ubus/", data=json.dumps(payload), headers={
-            'content-type': 'application/json',
-            "Referer": self._url
-        })
-        self._req_id += 1
-        response_json = (await response.json())[0]
+        self._ubus_rpc_session = ANONYMOUS_SESSION
+        self._session_expires = 0.0
+
+    def _sessionValid(self) -> bool:
+        return self.connected and monotonic() < self._session_expires
+
+    def _parseResponse(self, response_json):
         if "error" in response_json:
             raise APIAuthError(response_json['error']['message'])
         result = response_json['result']
         if result[0] == 0:
             if len(result) > 1:
-                return response_json['result'][1]
+                return result[1]
             return {}
+        if result[0] == UBUS_STATUS_PERMISSION_DENIED:
+            raise APIAuthError("access denied")
         raise APIConnectionError("invalid jsonrpc response status: " + str(result[0]))
 
-    async def _getLoginSalt(self):
-        self._resetSession()
-        return (await self.sendRequest("zwrt_web", "web_login_info"))['zte_web_sault']
+    def _encodeBatch(self, calls, session: str) -> tuple[bytes, list[int]]:
+        """Serialize calls as a JSON-RPC batch and return it with the ids of the calls.
+
+        Calls with the fixed parameters of a poll reuse their serialized form.
+        """
+        session_json = json_bytes(session)
+        ids = []
+        objects = []
+        for endpoint, method, params in calls:
+            request_id = next(self._req_ids)
+            ids.append(request_id)
+            template = _CALL_TEMPLATES.get(id(params))
+            if template is not None and template[0] is params:
+                call = template[1]
+            else:
+                call = _serializeCall(endpoint, method, params)
+            objects.append(b'{"jsonrpc":"2.0","id":%d,"method":"call","params":[%b%b' % (request_id, session_json, call))
+        return b"[" + b",".join(objects) + b"]", ids
+
+    async def sendRequest(self, endpoint, method, params = {}, priority: RequestPriority = RequestPriority.BACKGROUND, session: str = None, timeout: ClientTimeout = REQUEST_TIMEOUT):
+        return (await self.sendBatchRequest([(endpoint, method, params)], priority=priority, session=session, timeout=timeout))[0]
+
+    async def sendBatchRequest(self, calls, return_exceptions: bool = False, priority: RequestPriority = RequestPriority.BACKGROUND, session: str = None, timeout: ClientTimeout = REQUEST_TIMEOUT):
+        """Send several (endpoint, method, params) calls as one JSON-RPC batch.
+
+        Results are matched back to the calls by id and returned in call order.
+        With return_exceptions, a failed call yields its APIAuthError or
+        APIConnectionError in place of the result instead of raising.
+        The calls use the current session unless another one is given.
+        """
+        async with self.gate(priority), self.shared_gate(priority):
+            if session is None:
+                session = self._ubus_rpc_session
+            data, ids = self._encodeBatch(calls, session)
+            start = monotonic()
+            try:
+                response = await self._session.post(self._url + "ubus/", data=data, headers={
+                    'content-type': 'application/json',
+                    "Referer": self._url
+                }, timeout=timeout)
+                body = await response.read()
+                try:
+                    response_json = json_loads(body)
+                except ValueError as err:
+                    # an error page or a truncated answer instead of JSON-RPC
+                    raise APIConnectionError(f"invalid response from router: {err}") from err
+                if not isinstance(response_json, (dict, list)):
+                    raise APIConnectionError("invalid response from router")
+            except BaseException as err:
+                duration = (monotonic() - start) * 1000
+                for endpoint, method, _ in calls:
+                    self.metrics.record_call(endpoint, method, duration, type(err).__name__)
+                if isinstance(err, CONNECTION_ERRORS):
+                    self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            duration = (monotonic() - start) * 1000
+            self.metrics.record_request(len(data), len(body))
+
+        if isinstance(response_json, dict):
+            response_json = [response_json]
+        responses = {item.get('id'): item for item in response_json}
+        if self.capture is not None:
+            for request_id, (endpoint, method, params) in zip(ids, calls):
+                reply = responses.get(request_id, responses.get(None))
+                if reply is not None:
+                    self.capture.record(endpoint, method, params, reply, duration)
+
+        results = []
+        for request_id, (endpoint, method, _) in zip(ids, calls):
+            try:
+                if request_id in responses:
+                    results.append(self._parseResponse(responses[request_id]))
+                elif None in responses:
+                    # the router rejected the whole batch with a single error object
+                    results.append(self._parseResponse(responses[None]))
+                else:
+                    raise APIConnectionError("no response for " + endpoint + "." + method)
+                self.metrics.record_call(endpoint, method, duration)
+            except (APIAuthError, APIConnectionError) as err:
+                self.metrics.record_call(endpoint, method, duration, type(err).__name__)
+                if not return_exceptions:
+                    raise
+                results.append(err)
+        return results
+
+    async def _getLoginSalt(self, priority: RequestPriority = RequestPriority.BACKGROUND):
+        return (await self.sendRequest(*LOGIN_INFO_CALL, priority=priority, session=ANONYMOUS_SESSION))['zte_web_sault']
+
+    async def probe(self) -> bool:
+        """Return whether the router answers a cheap call that needs no login."""
+        try:
+            await self.sendRequest(*LOGIN_INFO_CALL, priority=RequestPriority.INTERACTIVE, session=ANONYMOUS_SESSION, timeout=PROBE_TIMEOUT)
+        except (APIAuthError, APIConnectionError):
+            # the router answered, if not with what was asked
+            return True
+        except CONNECTION_ERRORS:
+            return False
+        return True
+
+    async def _checkCircuit(self) -> None:
+        """Fail right away while the circuit is open, probe the router once it is half open."""
+        if self.breaker.state is CircuitState.CLOSED:
+            return
+        async with self._probe_lock:
+            # another call may have probed while this one waited for the lock
+            state = self.breaker.state
+            if state is CircuitState.CLOSED:
+                return
+            if state is CircuitState.HALF_OPEN and await self.probe():
+                return
+            raise APIConnectionError(f"router not reachable, next try in {self.breaker.retry_in():.0f} seconds")
 
     def _hash(self, str):
         hashed = hashlib.sha256(str.encode()).hexdigest()
         return hashed
 
-    async def login(self, password):
-        salt = await self._getLoginSalt()
-        hashPassword = self._hash(password).upper()
+    async def _call(self, endpoint, method, params = {}, priority: RequestPriority = RequestPriority.BACKGROUND):
+        """Send a request on the current session.
+
+        Logs in first if there is no session or it has expired. If the router
+        rejects the session, logs in again and retries the call once.
+        """
+        return (await self._callBatch([(endpoint, method, params)], priority=priority))[0]
+
+    async def _callBatch(self, calls, return_exceptions: bool = False, priority: RequestPriority = RequestPriority.BACKGROUND):
+        """Send a batch on the current session, with the same login and retry rules as _call."""
+        await self._checkCircuit()
+        session = await self._ensureSession(priority)
+        results = await self.sendBatchRequest(calls, return_exceptions=True, priority=priority, session=session)
+        rejected = [index for index, result in enumerate(results) if isinstance(result, APIAuthError)]
+        if rejected:
+            _LOGGER.debug("session rejected by router, logging in again")
+            session = await self._ensureSession(priority, rejected=session)
+            retried = await self.sendBatchRequest([calls[index] for index in rejected], return_exceptions=True, priority=priority, session=session)
+            for index, result in zip(rejected, retried):
+                results[index] = result
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    async def _ensureSession(self, priority: RequestPriority, rejected: str = None) -> str:
+        """Return a valid session, logging in if needed.
+
+        Only one login runs at a time. Callers that find a login in progress
+        wait for it and use its session instead of logging in again. A
+        session the router rejected is replaced even if it has not expired.
+        """
+        async with self._login_lock:
+            if self._sessionValid() and self._ubus_rpc_session != rejected:
+                return self._ubus_rpc_session
+            await self.login(priority=priority)
+            return self._ubus_rpc_session
+
+    async def login(self, password: str = None, priority: RequestPriority = RequestPriority.BACKGROUND):
+        if password is not None:
+            self._password = password
+        self.metrics.record_login()
+        salt = await self._getLoginSalt(priority)
+        hashPassword = self._hash(self._password).upper()
         ztePass = self._hash(hashPassword + salt).upper()
         response = await self.sendRequest("zwrt_web", "web_login",{
             "password": ztePass
-        })
+        }, priority=priority, session=ANONYMOUS_SESSION)
         if response['result'] != 0:
+            self._resetSession()
             raise APIAuthError(response['msg'])
         self._ubus_rpc_session = response['ubus_rpc_session']
+        self._session_expires = monotonic() + self._session_lifetime
         self.connected = True
 
     async def getWANStatistics(self):
-        return await self.sendRequest("zwrt_data", "get_wwandst", {
-            "source_module": "web",
-            "cid": 1,
-            "type": 4
-        })
+        return await self._call(*WAN_STATISTICS_CALL)
     
     async def getNetworkInfo(self):
-        return await self.sendRequest("zte_nwinfo_api", "nwinfo_get_netinfo")
+        return await self._call(*NETWORK_INFO_CALL)
 
     def _format_date(self, str):
         parts = str.split(",")
@@ -96,31 +331,115 @@ class API:
         return f"{custom_format};{tz_offset:+d}"
 
     async def getSMSMessages(self):
-        response = await self.sendRequest("zwrt_wms", "zte_libwms_get_sms_data", {
-            "page": 0,
-            "data_per_page": 500,
-            "mem_store": 1,
-            "tags": 10,
-            "order_by": "order by id desc"
-        })
-        for message in response['messages']:
+        return await self._syncSMSMessages(await self._call(*SMS_MESSAGES_CALL))
+
+    async def _syncSMSMessages(self, response):
+        """Merge the inbox listing into the message cache.
+
+        Takes the first page of the listing and only fetches further pages
+        while they contain messages newer than the highest id seen so far.
+        Only messages not yet in the cache are decoded.
+        """
+        fullSync = self._sms_syncs % SMS_FULL_SYNC_INTERVAL == 0
+        self._sms_syncs += 1
+        seen = set()
+        lowestSeen = None
+        page = 0
+        while True:
+            messages = response['messages']
+            for message in messages:
+                self._cacheSMSMessage(message)
+                seen.add(str(message['id']))
+            if messages:
+                lowestSeen = int(messages[-1]['id'])
+            listedAll = len(messages) < SMS_PAGE_SIZE
+            reachedKnown = any(int(message['id']) <= self._sms_max_id for message in messages)
+            if listedAll or (reachedKnown and not fullSync):
+                break
+            page += 1
+            response = await self._call(*_smsPageCall(page))
+
+        # Drop cached messages that should have been listed but were not.
+        # Unless the whole inbox was listed, only the range covered by the fetched pages is known.
+        for id in list(self._sms_cache):
+            if id not in seen and (listedAll or (lowestSeen is not None and int(id) >= lowestSeen)):
+                del self._sms_cache[id]
+        if seen:
+            self._sms_max_id = max(self._sms_max_id, max(int(id) for id in seen))
+
+        messages = sorted(self._sms_cache.values(), key=lambda message: int(message['id']), reverse=True)
+        return list(filter(lambda message: message['tag'] != SMS_TAG_SENT, messages))
+
+    def _cacheSMSMessage(self, message):
+        cached = self._sms_cache.get(str(message['id']))
+        if cached is None:
             message['content'] = decodeMessage(message['content'])
             message['date'] = self._format_date(message['date']).timestamp()
-        return list(filter(lambda message: message['tag'] != '2', response['messages']))
-    
-    async def sendSMSMessage(self, address, message):
-        await self.sendRequest("zwrt_wms", "zte_libwms_send_sms", {
+            self._sms_cache[str(message['id'])] = message
+        elif cached['tag'] != message['tag']:
+            # The read state can change, the content cannot. Replace rather
+            # than update the cached message so a changed listing compares unequal.
+            self._sms_cache[str(message['id'])] = {**cached, 'tag': message['tag']}
+
+    async def callMethod(self, endpoint: str, method: str, params: dict):
+        """Call any ubus method on the current session and return its result."""
+        return await self._call(endpoint, method, params, priority=RequestPriority.INTERACTIVE)
+
+    def getCachedSMSMessages(self) -> list[dict]:
+        """Return the messages on the router as of the last sync, sent ones included, oldest first."""
+        return sorted(self._sms_cache.values(), key=lambda message: int(message['id']))
+
+    async def deleteSMSMessages(self, ids: list[str], priority: RequestPriority = RequestPriority.INTERACTIVE):
+        """Delete messages on the router."""
+        for chunk in _smsIdChunks(ids):
+            await self._call("zwrt_wms", "zte_libwms_delete_sms", {"id": chunk}, priority=priority)
+        for id in ids:
+            self._sms_cache.pop(str(id), None)
+
+    async def markSMSMessagesRead(self, ids: list[str]):
+        """Mark received messages on the router as read."""
+        for chunk in _smsIdChunks(ids):
+            await self._call("zwrt_wms", "zte_libwms_set_msg_read", {"id": chunk, "tag": 0}, priority=RequestPriority.INTERACTIVE)
+        for id in ids:
+            cached = self._sms_cache.get(str(id))
+            if cached is not None and cached['tag'] == SMS_TAG_UNREAD:
+                self._sms_cache[str(id)] = {**cached, 'tag': SMS_TAG_READ}
+
+    async def getPollData(self, endpoints = POLL_ENDPOINTS, return_exceptions: bool = False):
+        """Fetch the given poll endpoints in one batched request.
+
+        Returns a dict of endpoint name to result. With return_exceptions, a
+        call that failed yields its exception in place of the result so the
+        other results can still be used.
+        """
+        endpoints = list(endpoints)
+        results = await self._callBatch([POLL_CALLS[endpoint] for endpoint in endpoints], return_exceptions=return_exceptions)
+        data = dict(zip(endpoints, results))
+        if "sms_messages" in data and not isinstance(data["sms_messages"], Exception):
+            try:
+                data["sms_messages"] = await self._syncSMSMessages(data["sms_messages"])
+            except Exception as err:
+                if not return_exceptions:
+                    raise
+                data["sms_messages"] = err
+        return data
+
+    async def sendSMSMessage(self, address, message, encode_type: str = "GSM7_default"):
+        await self._call("zwrt_wms", "zte_libwms_send_sms", {
             "number": address,
             "sms_time": self._current_date_string(),
             "message_body": encodeMessage(message),
             "id": "-1",
-            "encode_type": "GSM7_default"
-        })
+            "encode_type": encode_type
+        }, priority=RequestPriority.INTERACTIVE)
     
     async def reboot(self):
-        await self.sendRequest("zwrt_mc.device.manager", "device_reboot", {
+        await self._call("zwrt_mc.device.manager", "device_reboot", {
             "moduleName":"web"
-        })
+        }, priority=RequestPriority.INTERACTIVE)
+        # the session is gone with the reboot, requests fail right away until the router answers again
+        self._resetSession()
+        self.breaker.recover(REBOOT_GRACE)
 
 class APIAuthError(Exception):
     """Exception class for auth error."""
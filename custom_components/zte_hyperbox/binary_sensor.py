@@ -4,7 +4,6 @@ from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.const import (
     EntityCategory,
     UnitOfInformation,
@@ -13,13 +12,36 @@ from homeassistant.const import (
     STATE_ON,
     STATE_OFF
 )
+from dataclasses import dataclass
 from datetime import datetime
 
 from .const import DOMAIN
 from .coordinator import HyperboxCoordinator
+from .entity import HyperboxEntity
 
 _LOGGER = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class HyperboxBinarySensorDescription:
+    """A value of an endpoint and the values that turn its binary sensor on."""
+
+    endpoint_key: str
+    data_key: str
+    positive_values: tuple
+    icon: str = None
+    # enabled by default
+    visible: bool = True
+    category: EntityCategory = None
+
+
+# Binary sensors of the endpoint values, only created for the keys the router returns
+BINARY_SENSOR_DESCRIPTIONS: tuple[HyperboxBinarySensorDescription, ...] = (
+    HyperboxBinarySensorDescription(endpoint_key="network_info", data_key="nitz_sync_flag", positive_values=(1,)), #Synchronisation aktiv
+    HyperboxBinarySensorDescription(endpoint_key="network_info", data_key="simcard_roam", positive_values=("Internal", "International")), #Roaming-Status der SIM
+    HyperboxBinarySensorDescription(endpoint_key="network_info", data_key="lteca_state", positive_values=(1,), visible=False), #CA Status
+)
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -34,41 +56,34 @@ async def async_setup_entry(
     # to a list for each one.
     # This maybe different in your specific case, depending on how your data is structured
     sensors = [
-        HyperboxBinarySensor(coordinator, endpoint_key="network_info", data_key="nitz_sync_flag", positive_values=[1]), #Synchronisation aktiv
-        HyperboxBinarySensor(coordinator, endpoint_key="network_info", data_key="simcard_roam", positive_values=["Internal", "International"]), #Roaming-Status der SIM
-        HyperboxBinarySensor(coordinator, endpoint_key="network_info", data_key="lteca_state", positive_values=[1], visible=False), #CA Status
+        HyperboxBinarySensor(coordinator, description)
+        for description in BINARY_SENSOR_DESCRIPTIONS
+        if coordinator.provides(description.endpoint_key, description.data_key)
     ]
 
     # Create the sensors.
     async_add_entities(sensors)
 
-class HyperboxBinarySensor(CoordinatorEntity):
+class HyperboxBinarySensor(HyperboxEntity):
     
-    _attr_should_poll = False
-    _attr_has_entity_name = True
-    
-    def __init__(self, coordinator: HyperboxCoordinator, endpoint_key: str, data_key: str, positive_values: list[any], icon: str = None, visible: bool = True, category: str = None) -> None:
+    def __init__(self, coordinator: HyperboxCoordinator, description: HyperboxBinarySensorDescription) -> None:
         super().__init__(coordinator)
-        self.device_info = coordinator.device_info
-        self.translation_key = endpoint_key + "_" + data_key
-        self.entity_registry_enabled_default = visible
-        self._attr_unique_id = f"{coordinator.hostname}-{endpoint_key}-{data_key}"
-        self._endpoint_key = endpoint_key
-        self._data_key = data_key
-        self._positive_values = positive_values
-        if icon is not None:
-            self._attr_icon = icon
-        if category is not None:
-            self._attr_entity_category = category
+        self.translation_key = description.endpoint_key + "_" + description.data_key
+        self.entity_registry_enabled_default = description.visible
+        self._attr_unique_id = f"{coordinator.hostname}-{description.endpoint_key}-{description.data_key}"
+        self._endpoint_key = description.endpoint_key
+        self._data_key = description.data_key
+        self._positive_values = description.positive_values
+        self._snapshot_index = coordinator.snapshot_index(description.endpoint_key, description.data_key)
+        if description.icon is not None:
+            self._attr_icon = description.icon
+        if description.category is not None:
+            self._attr_entity_category = description.category
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-    
     @property
     def is_on(self) -> bool:
         """Return the state of the sensor."""
-        return getattr(self.coordinator.data, self._endpoint_key)[self._data_key] in self._positive_values
+        return self._value in self._positive_values
     
     @property
     def state(self):
@@ -0,0 +1,94 @@
+from enum import StrEnum
+import logging
+from time import monotonic
+
+_LOGGER = logging.getLogger(__name__)
+
+# failed requests in a row after which the circuit opens
+FAILURE_THRESHOLD = 3
+# seconds the circuit stays open after it opened, doubled after every failed probe
+OPEN_COOLDOWN = 5
+MAX_OPEN_COOLDOWN = 60
+# seconds between probes while waiting for the router to come back from a reboot
+RECOVERY_PROBE_INTERVAL = 3
+
+
+class CircuitState(StrEnum):
+    """State of the circuit breaker."""
+
+    # requests are sent
+    CLOSED = "closed"
+    # requests fail right away
+    OPEN = "open"
+    # the cooldown is over, a probe decides whether the circuit closes
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops sending requests to a router that does not answer.
+
+    After FAILURE_THRESHOLD failed requests in a row the circuit opens and
+    requests fail right away. Once the cooldown is over the circuit is half
+    open: the next request is preceded by a cheap probe, which closes the
+    circuit if the router answers and opens it again for twice as long if
+    it does not. While recovering from a reboot the probes run at a short
+    fixed interval instead.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._failures = 0
+        self._open_until: float = None
+        self._cooldown = OPEN_COOLDOWN
+        self.recovering = False
+        self._grace_until = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._open_until is None:
+            return CircuitState.CLOSED
+        if monotonic() < self._open_until:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def retry_in(self) -> float:
+        """Return the seconds until the circuit is half open, 0 if it is not open."""
+        if self._open_until is None:
+            return 0.0
+        return max(0.0, self._open_until - monotonic())
+
+    def record_success(self) -> None:
+        if self.recovering and monotonic() < self._grace_until:
+            # an answer from before the router went down
+            return
+        if self._open_until is not None:
+            _LOGGER.info("%s is reachable again", self._name)
+        self._failures = 0
+        self._open_until = None
+        self._cooldown = OPEN_COOLDOWN
+        self.recovering = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._open_until is not None:
+            # a probe failed, wait longer before the next one
+            if not self.recovering:
+                self._cooldown = min(MAX_OPEN_COOLDOWN, self._cooldown * 2)
+            self._open_until = monotonic() + self._cooldown
+        elif self._failures >= FAILURE_THRESHOLD:
+            _LOGGER.warning("%s is not answering, pausing requests for %s seconds", self._name, self._cooldown)
+            self._open_until = monotonic() + self._cooldown
+
+    def recover(self, grace: float) -> None:
+        """Open the circuit for a reboot and probe at a short interval once the grace period is over."""
+        self.recovering = True
+        self._cooldown = RECOVERY_PROBE_INTERVAL
+        self._grace_until = self._open_until = monotonic() + grace
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "retry_in": round(self.retry_in(), 1),
+            "recovering": self.recovering,
+        }
@@ -8,18 +8,19 @@ from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
     BinarySensorEntity,
 )
+from homeassistant.components.button import ButtonDeviceClass, ButtonEntity
 from homeassistant.const import (
     STATE_ON,
     STATE_OFF,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.const import PERCENTAGE
 
 from .const import DOMAIN
 from .coordinator import HyperboxCoordinator
+from .entity import HyperboxEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,21 +45,15 @@ async def async_setup_entry(
     # Create the sensors.
     async_add_entities(sensors)
 
-class RebootButton(CoordinatorEntity):
+class RebootButton(HyperboxEntity, ButtonEntity):
     
-    _attr_should_poll = False
-    _attr_has_entity_name = True
     _attr_icon = "mdi:restart"
+    _attr_device_class = ButtonDeviceClass.RESTART
     
     def __init__(self, coordinator: HyperboxCoordinator) -> None:
         super().__init__(coordinator)
-        self.device_info = coordinator.device_info
         self.translation_key = "reboot"
         self._attr_unique_id = f"{coordinator.hostname}-{self.translation_key}"
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-
-    async def _async_press_action(self) -> None:
+    async def async_press(self) -> None:
         await self.coordinator.reboot()
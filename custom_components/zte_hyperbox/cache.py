@@ -0,0 +1,69 @@
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from time import monotonic
+
+# results kept, the least recently used is evicted first
+CACHE_SIZE = 64
+
+
+class ResponseCache:
+    """Results of router calls by key, reused while they are young enough.
+
+    Callers asking for a key whose call is still running wait for that call
+    instead of sending their own, so concurrent callers cause one request.
+    Failed calls are not cached.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE) -> None:
+        self._size = size
+        # key -> (monotonic time of the result, result), least recently used first
+        self._results: OrderedDict[Hashable, tuple[float, any]] = OrderedDict()
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    async def get(self, key: Hashable, max_age: float, fetch: Callable[[], Awaitable]) -> any:
+        """Return the cached result if it is at most max_age seconds old, else fetch it."""
+        cached = self._results.get(key)
+        if cached is not None and monotonic() - cached[0] <= max_age:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            # shielded so a cancelled caller does not cancel the call the others wait for
+            return await asyncio.shield(pending)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # retrieved so a failure nobody else waited for is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            self._results[key] = (monotonic(), result)
+            self._results.move_to_end(key)
+            while len(self._results) > self._size:
+                self._results.popitem(last=False)
+            return result
+        finally:
+            del self._pending[key]
+
+    def as_dict(self) -> dict:
+        return {
+            "size": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
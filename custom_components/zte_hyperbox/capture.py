@@ -0,0 +1,156 @@
+import asyncio
+from collections import defaultdict
+import gzip
+import json
+from time import time
+
+CAPTURE_VERSION = 1
+# calls recorded by a capture unless asked for another number
+CAPTURE_SIZE = 200
+REDACTED = "**REDACTED**"
+# keys whose values are secrets or identify the router or the subscriber
+SECRET_KEYS = frozenset({
+    "password", "ubus_rpc_session", "zte_web_sault",
+    "imei", "imsi", "sim_imsi", "iccid", "sim_iccid", "msisdn", "mac", "wan_ipaddr", "ipv6_wan_ipaddr",
+})
+# phone numbers, replaced by a number that is the same for the same original within a capture
+NUMBER_KEYS = frozenset({"number"})
+# hex encoded SMS texts, replaced by a placeholder text of the same length
+TEXT_KEYS = frozenset({"content", "message_body"})
+# ubus status code of a method that does not exist
+UBUS_STATUS_NOT_FOUND = 4
+
+
+def _params_key(params) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+class TrafficCapture:
+    """Sanitized ubus calls and their replies, up to a fixed number of calls.
+
+    Secrets are redacted and phone numbers and message texts replaced as
+    the calls are recorded, so nothing sensitive is kept in memory either.
+    """
+
+    def __init__(self, limit: int = CAPTURE_SIZE) -> None:
+        self.limit = limit
+        self.started = time()
+        self.calls: list[dict] = []
+        self._numbers: dict[str, str] = {}
+        # set once the capture is full
+        self.done = asyncio.Event()
+
+    def record(self, endpoint: str, method: str, params: dict, reply: dict, duration_ms: float) -> None:
+        if self.done.is_set():
+            return
+        self.calls.append({
+            "endpoint": endpoint,
+            "method": method,
+            "params": self._sanitize(params),
+            "reply": self._sanitize(reply),
+            "ms": round(duration_ms, 1),
+        })
+        if len(self.calls) >= self.limit:
+            self.done.set()
+
+    def _sanitize(self, value):
+        if isinstance(value, list):
+            return [self._sanitize(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        sanitized = {}
+        for key, item in value.items():
+            if key in SECRET_KEYS and item not in (None, ""):
+                sanitized[key] = REDACTED
+            elif key in NUMBER_KEYS and isinstance(item, str):
+                sanitized[key] = self._numbers.setdefault(item, f"+{len(self._numbers) + 1:012d}")
+            elif key in TEXT_KEYS and isinstance(item, str):
+                # UCS-2 "x" characters, so decoding the text costs what it did
+                sanitized[key] = ("0078" * (len(item) // 4)).ljust(len(item), "0")
+            else:
+                sanitized[key] = self._sanitize(item)
+        return sanitized
+
+    def as_dict(self) -> dict:
+        return {
+            "version": CAPTURE_VERSION,
+            "started": self.started,
+            "calls": self.calls,
+        }
+
+
+def write_capture(path: str, capture: dict) -> None:
+    """Write a capture as gzipped JSON, blocking."""
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump(capture, file, separators=(",", ":"))
+
+
+def load_capture(path: str) -> dict:
+    """Read a capture written by write_capture, blocking."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return json.load(file)
+
+
+class ReplayResponse:
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class ReplaySession:
+    """Answers the API's requests from a capture instead of a router.
+
+    Takes the place of the aiohttp session of API. Each call is answered
+    with the next recorded reply of the same method and params, or of the
+    same method if the params were not recorded, starting over once all
+    were used. Replies come back right away. Counts requests, calls and
+    bytes like the router simulator does.
+    """
+
+    def __init__(self, capture: dict) -> None:
+        self._by_params: dict[tuple, list[dict]] = defaultdict(list)
+        self._by_method: dict[tuple, list[dict]] = defaultdict(list)
+        for call in capture["calls"]:
+            self._by_params[(call["endpoint"], call["method"], _params_key(call["params"]))].append(call["reply"])
+            self._by_method[(call["endpoint"], call["method"])].append(call["reply"])
+        self._next: dict[tuple, int] = defaultdict(int)
+        self.reset_counters()
+
+    def reset_counters(self) -> None:
+        self.requests = 0
+        self.calls = 0
+        self.logins = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    def _reply(self, endpoint: str, method: str, params: dict) -> dict:
+        key = (endpoint, method, _params_key(params))
+        replies = self._by_params.get(key)
+        if replies is None:
+            key = (endpoint, method)
+            replies = self._by_method.get(key)
+        if replies is None:
+            if (endpoint, method) == ("zwrt_web", "web_login_info"):
+                return {"result": [0, {"zte_web_sault": REDACTED}]}
+            if (endpoint, method) == ("zwrt_web", "web_login"):
+                return {"result": [0, {"result": 0, "ubus_rpc_session": REDACTED}]}
+            return {"result": [UBUS_STATUS_NOT_FOUND]}
+        index = self._next[key] % len(replies)
+        self._next[key] += 1
+        return replies[index]
+
+    async def post(self, url: str, data: bytes, headers: dict = None, timeout=None) -> ReplayResponse:
+        self.requests += 1
+        self.bytes_received += len(data)
+        response = []
+        for call in json.loads(data):
+            self.calls += 1
+            _, endpoint, method, params = call["params"]
+            if (endpoint, method) == ("zwrt_web", "web_login"):
+                self.logins += 1
+            response.append({**self._reply(endpoint, method, params), "jsonrpc": "2.0", "id": call["id"]})
+        body = json.dumps(response).encode()
+        self.bytes_sent += len(body)
+        return ReplayResponse(body)
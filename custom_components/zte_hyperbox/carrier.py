@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+# fields of one component carrier in the semicolon separated CA strings of nwinfo_get_netinfo
+LTECA_FIELDS = ("index", "band", "channel", "bandwidth", "pci")
+LTECASIG_FIELDS = ("index", "rsrp", "snr")
+NRCA_FIELDS = ("index", "band", "channel", "bandwidth", "pci", "rsrp", "snr")
+
+
+@dataclass(frozen=True, slots=True)
+class Carrier:
+    """One active component carrier of the LTE or 5G connection."""
+
+    rat: str
+    band: str
+    channel: int | None
+    pci: int | None
+    bandwidth: float | None
+    rsrp: float | None
+    snr: float | None
+
+    @property
+    def key(self) -> str:
+        return f"{self.rat}_b{self.band}_{self.channel}"
+
+
+def _number(value: str, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _records(value, fields: tuple[str, ...]) -> list[dict[str, str]]:
+    """Split a CA string into one dict per carrier, skipping empty and short records."""
+    if not isinstance(value, str):
+        return []
+    records = []
+    for record in value.split(";"):
+        parts = [part.strip() for part in record.split(",")]
+        if len(parts) < 2 or not parts[1]:
+            continue
+        records.append(dict(zip(fields, parts)))
+    return records
+
+
+def _band(value: str) -> str:
+    # bands come as "3" or "n78", keep the number only
+    return value.lower().removeprefix("n").removeprefix("b")
+
+
+def parse_carriers(network_info: dict) -> dict[str, Carrier]:
+    """Return the active component carriers of a network info response by key."""
+    if not isinstance(network_info, dict):
+        return {}
+    signals = {record['index']: record for record in _records(network_info.get("ltecasig"), LTECASIG_FIELDS)}
+    carriers = []
+    for record in _records(network_info.get("lteca"), LTECA_FIELDS):
+        signal = signals.get(record['index'], {})
+        carriers.append(Carrier(
+            rat="lte",
+            band=_band(record['band']),
+            channel=_number(record.get("channel"), int),
+            pci=_number(record.get("pci"), int),
+            bandwidth=_number(record.get("bandwidth")),
+            rsrp=_number(signal.get("rsrp")),
+            snr=_number(signal.get("snr")),
+        ))
+    for record in _records(network_info.get("nrca"), NRCA_FIELDS):
+        carriers.append(Carrier(
+            rat="nr",
+            band=_band(record['band']),
+            channel=_number(record.get("channel"), int),
+            pci=_number(record.get("pci"), int),
+            bandwidth=_number(record.get("bandwidth")),
+            rsrp=_number(record.get("rsrp")),
+            snr=_number(record.get("snr")),
+        ))
+    return {carrier.key: carrier for carrier in carriers}
@@ -0,0 +1,71 @@
+from collections import deque
+
+from .snapshot import MISSING
+
+# network info fields compared between polls, by the change they make up
+CELL_FIELDS = ("cell_id", "lte_pci", "nr5g_cell_id", "nr5g_pci")
+RAT_FIELDS = ("network_type",)
+BAND_FIELDS = ("wan_active_band", "nr5g_action_band")
+TRACKED_FIELDS = (*CELL_FIELDS, *RAT_FIELDS, *BAND_FIELDS)
+# changes by name, with the positions of their fields in TRACKED_FIELDS
+CHANGES = {
+    "cell": range(0, len(CELL_FIELDS)),
+    "rat": range(len(CELL_FIELDS), len(CELL_FIELDS) + len(RAT_FIELDS)),
+    "band": range(len(CELL_FIELDS) + len(RAT_FIELDS), len(TRACKED_FIELDS)),
+}
+# cells kept in the history, the oldest are dropped first
+CELL_HISTORY_SIZE = 50
+
+
+class CellTracker:
+    """Detects cell, RAT and band changes between polls and keeps the recent cells.
+
+    The tracked values of a poll come as one tuple, so a poll without a
+    change costs a single comparison.
+    """
+
+    def __init__(self, size: int = CELL_HISTORY_SIZE) -> None:
+        self._values: tuple = None
+        # time of the last change of each kind
+        self._since: dict[str, float] = {}
+        self._history: deque[dict] = deque(maxlen=size)
+
+    def update(self, values: tuple, timestamp: float) -> list[tuple[str, dict]]:
+        """Take the tracked values of a poll and return (change, data) of each kind that changed.
+
+        The first poll only sets the values to compare with.
+        """
+        values = tuple(None if value is MISSING else value for value in values)
+        previous = self._values
+        if values == previous:
+            return []
+        self._values = values
+        if previous is None:
+            self._since = dict.fromkeys(CHANGES, timestamp)
+            self._enter_cell(timestamp)
+            return []
+        changes = []
+        for change, positions in CHANGES.items():
+            if all(values[position] == previous[position] for position in positions):
+                continue
+            changes.append((change, {
+                "before": {TRACKED_FIELDS[position]: previous[position] for position in positions},
+                "after": {TRACKED_FIELDS[position]: values[position] for position in positions},
+                "dwell": round(timestamp - self._since[change], 1),
+            }))
+            self._since[change] = timestamp
+        if any(change == "cell" for change, _ in changes):
+            self._history[-1]["until"] = timestamp
+            self._enter_cell(timestamp)
+        return changes
+
+    def _enter_cell(self, timestamp: float) -> None:
+        self._history.append({
+            **dict(zip(TRACKED_FIELDS, self._values)),
+            "since": timestamp,
+            "until": None,
+        })
+
+    def history(self) -> list[dict]:
+        """Return the recent cells, newest first, the current one with until None."""
+        return list(reversed(self._history))
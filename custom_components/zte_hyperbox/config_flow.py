@@ -1,14 +1,47 @@
 from __future__ import annotations
 
 import voluptuous as vol
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlowWithConfigEntry
+from homeassistant.core import callback
 
 from homeassistant.const import (
     CONF_HOST,
     CONF_PASSWORD
 )
 
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    CONF_SESSION_LIFETIME,
+    DEFAULT_SESSION_LIFETIME,
+    CONF_NETWORK_STATISTICS_INTERVAL,
+    CONF_NETWORK_INFO_INTERVAL,
+    CONF_SMS_INTERVAL,
+    DEFAULT_NETWORK_STATISTICS_INTERVAL,
+    DEFAULT_NETWORK_INFO_INTERVAL,
+    DEFAULT_SMS_INTERVAL,
+    CONF_SIGNAL_DEADBAND,
+    DEFAULT_SIGNAL_DEADBAND,
+    CONF_SMS_ATTRIBUTE_MESSAGES,
+    DEFAULT_SMS_ATTRIBUTE_MESSAGES,
+    CONF_SMS_SEND_INTERVAL,
+    DEFAULT_SMS_SEND_INTERVAL,
+    CONF_ADAPTIVE_POLLING,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    CONF_HISTORY_WINDOW,
+    DEFAULT_HISTORY_WINDOW,
+    CONF_UNKNOWN_KEYS,
+    DEFAULT_UNKNOWN_KEYS,
+    CONF_SMS_ROUTER_LIMIT,
+    DEFAULT_SMS_ROUTER_LIMIT,
+    CONF_UBUS_ALLOWLIST,
+    CONF_UBUS_DENYLIST,
+    DEFAULT_UBUS_ALLOWLIST,
+    DEFAULT_UBUS_DENYLIST,
+)
 from .api import (
     API,
     APIAuthError,
@@ -18,6 +51,11 @@ from .api import (
 class HyperboxConfigFlow(ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> HyperboxOptionsFlow:
+        return HyperboxOptionsFlow(config_entry)
+
     async def async_step_user(self, formdata):
         if formdata is not None:
             hostname = formdata[CONF_HOST]
@@ -43,3 +81,31 @@ class HyperboxConfigFlow(ConfigFlow, domain=DOMAIN):
                 vol.Required(CONF_PASSWORD): str
             })
         )
+
+
+class HyperboxOptionsFlow(OptionsFlowWithConfigEntry):
+
+    async def async_step_init(self, formdata=None):
+        if formdata is not None:
+            return self.async_create_entry(data=formdata)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init", data_schema=vol.Schema({
+                vol.Required(CONF_NETWORK_STATISTICS_INTERVAL, default=options.get(CONF_NETWORK_STATISTICS_INTERVAL, DEFAULT_NETWORK_STATISTICS_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=5)),
+                vol.Required(CONF_NETWORK_INFO_INTERVAL, default=options.get(CONF_NETWORK_INFO_INTERVAL, DEFAULT_NETWORK_INFO_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=5)),
+                vol.Required(CONF_SMS_INTERVAL, default=options.get(CONF_SMS_INTERVAL, DEFAULT_SMS_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=5)),
+                vol.Required(CONF_ADAPTIVE_POLLING, default=options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING)): bool,
+                vol.Required(CONF_MIN_INTERVAL, default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Required(CONF_MAX_INTERVAL, default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=5)),
+                vol.Required(CONF_SMS_ATTRIBUTE_MESSAGES, default=options.get(CONF_SMS_ATTRIBUTE_MESSAGES, DEFAULT_SMS_ATTRIBUTE_MESSAGES)): vol.All(vol.Coerce(int), vol.Range(min=0, max=50)),
+                vol.Required(CONF_SMS_SEND_INTERVAL, default=options.get(CONF_SMS_SEND_INTERVAL, DEFAULT_SMS_SEND_INTERVAL)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(CONF_SMS_ROUTER_LIMIT, default=options.get(CONF_SMS_ROUTER_LIMIT, DEFAULT_SMS_ROUTER_LIMIT)): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(CONF_SIGNAL_DEADBAND, default=options.get(CONF_SIGNAL_DEADBAND, DEFAULT_SIGNAL_DEADBAND)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(CONF_HISTORY_WINDOW, default=options.get(CONF_HISTORY_WINDOW, DEFAULT_HISTORY_WINDOW)): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                vol.Required(CONF_SESSION_LIFETIME, default=options.get(CONF_SESSION_LIFETIME, DEFAULT_SESSION_LIFETIME)): vol.All(vol.Coerce(int), vol.Range(min=60)),
+                vol.Required(CONF_UNKNOWN_KEYS, default=options.get(CONF_UNKNOWN_KEYS, DEFAULT_UNKNOWN_KEYS)): bool,
+                vol.Optional(CONF_UBUS_ALLOWLIST, default=options.get(CONF_UBUS_ALLOWLIST, DEFAULT_UBUS_ALLOWLIST)): str,
+                vol.Optional(CONF_UBUS_DENYLIST, default=options.get(CONF_UBUS_DENYLIST, DEFAULT_UBUS_DENYLIST)): str,
+            })
+        )
@@ -1 +1,80 @@
 DOMAIN = "zte_hyperbox"
+
+EVENT_SMS_RECEIVED = f"{DOMAIN}_sms_received"
+EVENT_SMS_DELIVERY = f"{DOMAIN}_sms_delivery"
+EVENT_REBOOT = f"{DOMAIN}_reboot"
+EVENT_CELL_CHANGED = f"{DOMAIN}_cell_changed"
+EVENT_RAT_CHANGED = f"{DOMAIN}_rat_changed"
+EVENT_BAND_CHANGED = f"{DOMAIN}_band_changed"
+
+CONF_SESSION_LIFETIME = "session_lifetime"
+
+# seconds a ubus session is reused before logging in again
+DEFAULT_SESSION_LIFETIME = 3600
+
+# seconds to wait for the batched poll request before fetching endpoints one by one
+POLL_TIMEOUT = 20
+# seconds to wait for a single endpoint when fetching them one by one
+ENDPOINT_TIMEOUT = 10
+
+CONF_NETWORK_STATISTICS_INTERVAL = "network_statistics_interval"
+CONF_NETWORK_INFO_INTERVAL = "network_info_interval"
+CONF_SMS_INTERVAL = "sms_interval"
+
+# default polling interval in seconds of each endpoint
+DEFAULT_NETWORK_STATISTICS_INTERVAL = 10
+DEFAULT_NETWORK_INFO_INTERVAL = 10
+DEFAULT_SMS_INTERVAL = 60
+
+CONF_SIGNAL_DEADBAND = "signal_deadband"
+
+# signal changes (dB/dBm) smaller than this are not written to the state machine, 0 disables
+DEFAULT_SIGNAL_DEADBAND = 0
+
+CONF_SMS_ATTRIBUTE_MESSAGES = "sms_attribute_messages"
+
+# number of latest messages exposed as attributes of the messages sensor
+DEFAULT_SMS_ATTRIBUTE_MESSAGES = 5
+
+CONF_SMS_SEND_INTERVAL = "sms_send_interval"
+
+# seconds between two outgoing SMS
+DEFAULT_SMS_SEND_INTERVAL = 2
+
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+
+# bounds in seconds of adaptive polling and of the backoff while the router is unreachable
+DEFAULT_ADAPTIVE_POLLING = False
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 300
+
+CONF_HISTORY_WINDOW = "history_window"
+
+# seconds of recent samples the min/mean/max/p95 sensors are computed over
+DEFAULT_HISTORY_WINDOW = 300
+
+CONF_UNKNOWN_KEYS = "unknown_keys"
+
+# add disabled diagnostic sensors for values of the firmware that no sensor reads
+DEFAULT_UNKNOWN_KEYS = False
+
+CONF_SMS_ROUTER_LIMIT = "sms_router_limit"
+
+# messages kept on the router, older ones are deleted once stored locally, 0 keeps all
+DEFAULT_SMS_ROUTER_LIMIT = 0
+
+CONF_UBUS_ALLOWLIST = "ubus_allowlist"
+CONF_UBUS_DENYLIST = "ubus_denylist"
+
+# comma separated patterns of the methods the call_ubus service may call, all if empty, and of the
+# methods it may never call. Patterns with a dot match endpoint.method, the others match a whole word
+# of the method name, so "set" matches zte_libwms_set_msg_read but not get_wifi_settings. Matching
+# ignores case. By default only methods named after reading verbs may be called, and the denylist
+# keeps out logins and anything that changes the router even if its name also has such a verb.
+DEFAULT_UBUS_ALLOWLIST = "get, query, list, show, dump, status"
+DEFAULT_UBUS_DENYLIST = (
+    "zwrt_web.*, reboot, reset, factoryreset, restore, upgrade, poweroff, shutdown, set, send, delete, del, "
+    "add, modify, write, remove, clear, lock, unlock, enable, disable, apply, commit, save"
+)
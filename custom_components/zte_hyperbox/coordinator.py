@@ -1,21 +1,100 @@
-from dataclasses import dataclass
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
 from datetime import timedelta
 import logging
+from time import monotonic, time
+
+from aiohttp import ClientError
+from fnmatch import fnmatchcase
+import json
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONF_HOST,
     CONF_PASSWORD,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
 
-from .api import API, APIAuthError
-from .const import DOMAIN
+from .cache import ResponseCache
+from .capture import TrafficCapture, write_capture
+from .api import API, APIAuthError, APIConnectionError, REBOOT_GRACE
+from .carrier import Carrier, parse_carriers
+from .cells import TRACKED_FIELDS, CellTracker
+from .history import SampleHistory
+from .pipeline import RequestPriority
+from .scheduler import ADAPTIVE_ENDPOINTS, AdaptiveScheduler
+from .sms import SMSInbox, SMSOutbox, prune_messages, select_messages
+from .snapshot import Snapshot, SnapshotSchema
+from .transport import async_get_transport
+from .const import (
+    DOMAIN,
+    EVENT_SMS_RECEIVED,
+    EVENT_REBOOT,
+    EVENT_CELL_CHANGED,
+    EVENT_RAT_CHANGED,
+    EVENT_BAND_CHANGED,
+    CONF_SESSION_LIFETIME,
+    DEFAULT_SESSION_LIFETIME,
+    POLL_TIMEOUT,
+    ENDPOINT_TIMEOUT,
+    CONF_NETWORK_STATISTICS_INTERVAL,
+    CONF_NETWORK_INFO_INTERVAL,
+    CONF_SMS_INTERVAL,
+    DEFAULT_NETWORK_STATISTICS_INTERVAL,
+    DEFAULT_NETWORK_INFO_INTERVAL,
+    DEFAULT_SMS_INTERVAL,
+    CONF_SMS_SEND_INTERVAL,
+    DEFAULT_SMS_SEND_INTERVAL,
+    CONF_ADAPTIVE_POLLING,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    DEFAULT_ADAPTIVE_POLLING,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    CONF_HISTORY_WINDOW,
+    DEFAULT_HISTORY_WINDOW,
+    CONF_SMS_ROUTER_LIMIT,
+    DEFAULT_SMS_ROUTER_LIMIT,
+    CONF_UBUS_ALLOWLIST,
+    CONF_UBUS_DENYLIST,
+    DEFAULT_UBUS_ALLOWLIST,
+    DEFAULT_UBUS_DENYLIST,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# seconds to wait for the router to come back from a reboot
+REBOOT_TIMEOUT = 600
+
+SNAPSHOT_STORAGE_VERSION = 1
+# seconds between writes of the last good data, restored at the next start
+SNAPSHOT_SAVE_DELAY = 60
+
+
+# events fired for the changes found by the cell tracker
+CELL_EVENTS = {
+    "cell": EVENT_CELL_CHANGED,
+    "rat": EVENT_RAT_CHANGED,
+    "band": EVENT_BAND_CHANGED,
+}
+
+
+def _patterns(value: str) -> list[str]:
+    return [pattern.strip().lower() for pattern in value.split(",") if pattern.strip()]
+
+
+def _ubus_matches(endpoint: str, method: str, pattern: str) -> bool:
+    """Match endpoint.method for patterns with a dot, else any word of the method name, patterns are lowercase."""
+    if "." in pattern:
+        return fnmatchcase(f"{endpoint}.{method}".lower(), pattern)
+    return any(fnmatchcase(word, pattern) for word in method.lower().split("_"))
+
 
 @dataclass
 class HyperboxAPIData:
@@ -24,6 +103,19 @@ class HyperboxAPIData:
     network_statistics: dict[str, any]
     network_info: dict[str, any]
     sms_messages: list[any]
+    # converted values of the fields entities read, see HyperboxCoordinator.snapshot_index
+    snapshot: Snapshot = None
+    # active component carriers by key, parsed from the CA strings of network_info
+    carriers: dict[str, Carrier] = field(default_factory=dict)
+    # endpoints whose last fetch failed and which still hold an older value
+    stale: set[str] = field(default_factory=set)
+    # endpoints whose value was restored from storage and not fetched since
+    restored: set[str] = field(default_factory=set)
+    # endpoints that were fetched in this update
+    updated: set[str] = field(default_factory=set)
+    # (endpoint_key, data_key) pairs whose value changed in this update,
+    # (endpoint_key, None) if anything in the endpoint changed
+    changed: set[tuple[str, str]] = field(default_factory=set)
 
 
 class HyperboxCoordinator(DataUpdateCoordinator):
@@ -38,6 +130,33 @@ class HyperboxCoordinator(DataUpdateCoordinator):
         self.hostname = config_entry.data[CONF_HOST]
         self._password = config_entry.data[CONF_PASSWORD]
 
+        # Polling interval in seconds of each endpoint
+        options = config_entry.options
+        self._intervals = {
+            "network_statistics": options.get(CONF_NETWORK_STATISTICS_INTERVAL, DEFAULT_NETWORK_STATISTICS_INTERVAL),
+            "network_info": options.get(CONF_NETWORK_INFO_INTERVAL, DEFAULT_NETWORK_INFO_INTERVAL),
+            "sms_messages": options.get(CONF_SMS_INTERVAL, DEFAULT_SMS_INTERVAL),
+        }
+        self._last_fetch: dict[str, float] = {}
+        # stretches or shortens the radio endpoint intervals and backs off while the router is unreachable
+        self._adaptive = options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING)
+        self._scheduler = AdaptiveScheduler(
+            options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+            options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
+        )
+        # last good data, restored at setup so startup does not wait for the router
+        self._store = Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.snapshot")
+        self._save_pending = False
+        # recent throughput and signal samples, kept in memory instead of the recorder
+        self.history = SampleHistory(options.get(CONF_HISTORY_WINDOW, DEFAULT_HISTORY_WINDOW))
+        # fields entities read, converted once per poll into the snapshot
+        self._schema = SnapshotSchema()
+        # serving cell, RAT and band, compared between polls whether or not their sensors are enabled
+        self.cells = CellTracker()
+        self._cell_indexes = [self._schema.add("network_info", data_key) for data_key in TRACKED_FIELDS]
+        # (endpoint_key, data_key) pairs read by entities that are added to hass
+        self._consumers: Counter[tuple[str, str]] = Counter()
+
         self.device_info = DeviceInfo(
             name="ZTE Hyperbox",
             manufacturer="ZTE",
@@ -52,11 +171,43 @@ class HyperboxCoordinator(DataUpdateCoordinator):
             # Method to call on every update interval.
             update_method=self.async_update_data,
             # Polling interval. Will only be polled if there are subscribers.
-            update_interval=timedelta(seconds=60),
+            # Ticks at the shortest endpoint interval, each tick fetches the endpoints that are due.
+            update_interval=timedelta(seconds=min(self._intervals.values())),
         )
 
         # Initialise your api here
-        self.api = API(hass, hostname=self.hostname)
+        # Connections and the request limit are shared with the other routers
+        self._transport = async_get_transport(hass)
+        self._transport.register(self.hostname)
+        self._phase_shifted = False
+        self.api = API(
+            hass,
+            hostname=self.hostname,
+            password=self._password,
+            session_lifetime=config_entry.options.get(CONF_SESSION_LIFETIME, DEFAULT_SESSION_LIFETIME),
+            session=self._transport.session,
+            gate=self._transport.gate
+        )
+
+        # Received messages, kept locally so they survive deletion on the router
+        self.inbox = SMSInbox(hass, config_entry.entry_id)
+        # Messages waiting to be sent
+        self.outbox = SMSOutbox(
+            hass,
+            config_entry.entry_id,
+            self.api,
+            self.hostname,
+            send_interval=options.get(CONF_SMS_SEND_INTERVAL, DEFAULT_SMS_SEND_INTERVAL)
+        )
+        # messages kept on the router, the oldest stored ones are deleted beyond it
+        self._sms_router_limit = options.get(CONF_SMS_ROUTER_LIMIT, DEFAULT_SMS_ROUTER_LIMIT)
+        self._pruning = False
+        # results of the call_ubus service and the endpoint.method patterns it may call
+        self.ubus_cache = ResponseCache()
+        self._ubus_allowlist = _patterns(options.get(CONF_UBUS_ALLOWLIST, DEFAULT_UBUS_ALLOWLIST))
+        self._ubus_denylist = _patterns(options.get(CONF_UBUS_DENYLIST, DEFAULT_UBUS_DENYLIST))
+        # the last finished traffic capture and the file it was written to, shown in the diagnostics
+        self.last_capture: dict = None
 
     async def async_update_data(self):
         """Fetch data from API endpoint.
@@ -64,25 +215,320 @@ class HyperboxCoordinator(DataUpdateCoordinator):
         This is the place to pre-process the data to lookup tables
         so entities can quickly look up their data.
         """
+        due = self._due_endpoints()
+        if not due:
+            return replace(self.data, updated=set(), changed=set())
+        start = monotonic()
         try:
-            await self.api.login(password=self._password)
-            networkStatistics = await self.api.getWANStatistics()
-            networkInfo = await self.api.getNetworkInfo()
-            smsMessages = await self.api.getSMSMessages()
-            return HyperboxAPIData(
-                network_statistics=networkStatistics,
-                network_info=networkInfo,
-                sms_messages=smsMessages
-            )
+            data = await self._async_fetch_data(due)
+        except UpdateFailed:
+            self.api.metrics.record_poll((monotonic() - start) * 1000, False)
+            self.update_interval = timedelta(seconds=self._scheduler.backoff(self._tick(), self.api.metrics.consecutive_failures))
+            raise
+        if not data.updated:
+            # every due endpoint failed, their entities are unavailable and the others keep their data
+            self.api.metrics.record_poll((monotonic() - start) * 1000, False)
+            self.update_interval = timedelta(seconds=self._scheduler.backoff(self._tick(), self.api.metrics.consecutive_failures))
+            return data
+        self.api.metrics.record_poll((monotonic() - start) * 1000, True)
+        if not self._save_pending:
+            # a pending save is not pushed back, so the data is written at least once a minute
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+        tick = self._tick()
+        if not self._phase_shifted:
+            # Delay the second poll once, so routers set up together are polled
+            # at different points of the interval from then on.
+            self._phase_shifted = True
+            tick += self._transport.poll_offset(self.hostname, tick)
+        self.update_interval = timedelta(seconds=tick)
+        return data
+
+    async def _async_fetch_data(self, due: list[str]) -> HyperboxAPIData:
+        fetchers = {
+            "network_statistics": self.api.getWANStatistics,
+            "network_info": self.api.getNetworkInfo,
+            "sms_messages": self.api.getSMSMessages,
+        }
+        try:
+            async with asyncio.timeout(POLL_TIMEOUT):
+                results = await self.api.getPollData(due, return_exceptions=True)
+        except TimeoutError:
+            # A single slow call holds up the whole batch, so fetch the
+            # endpoints concurrently, each with its own timeout.
+            _LOGGER.debug("batched poll timed out, fetching endpoints one by one")
+            results = dict(zip(due, await asyncio.gather(
+                *(self._async_fetch_endpoint(fetchers[endpoint_key]) for endpoint_key in due),
+                return_exceptions=True
+            )))
         except Exception as err:
-            _LOGGER.error(err)
-            # This will show entities as unavailable by raising UpdateFailed exception
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
+            if self.data is None:
+                # logged by the coordinator once when polls start and stop failing
+                _LOGGER.debug(err)
+                # This will show entities as unavailable by raising UpdateFailed exception
+                raise UpdateFailed(f"Error communicating with API: {err}") from err
+            # only the due endpoints failed, the others keep their data
+            results = dict.fromkeys(due, err)
+
+        now = monotonic()
+        values = {}
+        stale = set()
+        updated = set()
+        changed = set()
+        for endpoint_key in fetchers:
+            result = results.get(endpoint_key)
+            if endpoint_key in results and not isinstance(result, Exception):
+                values[endpoint_key] = result
+                updated.add(endpoint_key)
+                changed.update(self._changed_keys(endpoint_key, result))
+                if self._adaptive and endpoint_key in ADAPTIVE_ENDPOINTS and self.data is not None:
+                    self._scheduler.observe(endpoint_key, getattr(self.data, endpoint_key), result)
+                self.history.record(endpoint_key, result, time())
+                if endpoint_key == "sms_messages":
+                    self._async_store_messages(result)
+                    self._async_prune_messages()
+                self._last_fetch[endpoint_key] = now
+                continue
+            if isinstance(result, Exception):
+                if self.data is None or endpoint_key not in self.data.stale:
+                    _LOGGER.warning("Error fetching %s: %s", endpoint_key, result)
+                stale.add(endpoint_key)
+            elif self.data is not None and endpoint_key in self.data.stale:
+                stale.add(endpoint_key)
+            # keep the last good value of endpoints that failed or were not due
+            values[endpoint_key] = getattr(self.data, endpoint_key) if self.data is not None else None
+
+        if not updated and self.data is None:
+            raise UpdateFailed(f"Error communicating with API: {next(iter(results.values()))}")
+        snapshot = self._schema.build(values, updated, self.data.snapshot if self.data is not None else None)
+        if "network_info" in updated:
+            self._async_track_cells(snapshot)
+            carriers = parse_carriers(values["network_info"])
+        else:
+            carriers = self.data.carriers if self.data is not None else {}
+        restored = self.data.restored - updated if self.data is not None else set()
+        return HyperboxAPIData(**values, snapshot=snapshot, carriers=carriers, stale=stale, restored=restored, updated=updated, changed=changed)
+
+    def _data_to_save(self) -> dict:
+        self._save_pending = False
+        return {endpoint_key: getattr(self.data, endpoint_key) for endpoint_key in self._intervals}
+
+    async def async_restore(self) -> bool:
+        """Set the data saved by the last run and return whether there was any.
+
+        The restored endpoints are flagged as restored until they are fetched.
+        """
+        saved = await self._store.async_load()
+        if not saved or any(endpoint_key not in saved for endpoint_key in self._intervals):
+            return False
+        values = {endpoint_key: saved[endpoint_key] for endpoint_key in self._intervals}
+        self.data = HyperboxAPIData(
+            **values,
+            snapshot=self._schema.build(values, values),
+            carriers=parse_carriers(values["network_info"]),
+            restored=set(values),
+        )
+        return True
+
+    @callback
+    def _async_store_messages(self, messages: list[dict]) -> None:
+        for message in self.inbox.update(messages):
+            self.hass.bus.async_fire(EVENT_SMS_RECEIVED, {
+                "host": self.hostname,
+                **message
+            })
+
+    @callback
+    def _async_prune_messages(self) -> None:
+        """Delete the oldest stored messages on the router in the background once it holds more than the limit."""
+        if not self._sms_router_limit or self._pruning:
+            return
+        ids = prune_messages(self.api.getCachedSMSMessages(), self.inbox, self._sms_router_limit)
+        if ids:
+            self._pruning = True
+            self.config_entry.async_create_background_task(
+                self.hass, self._async_prune(ids), f"{DOMAIN} sms prune {self.hostname}"
+            )
+
+    async def _async_prune(self, ids: list[str]) -> None:
+        try:
+            await self.api.deleteSMSMessages(ids, priority=RequestPriority.BACKGROUND)
+            _LOGGER.debug("Deleted %s old messages on %s", len(ids), self.hostname)
+        except (APIAuthError, APIConnectionError, ClientError, TimeoutError) as err:
+            _LOGGER.warning("Deleting old messages on %s failed: %s", self.hostname, err)
+        finally:
+            self._pruning = False
+
+    @callback
+    def _async_track_cells(self, snapshot: Snapshot) -> None:
+        for change, data in self.cells.update(tuple(snapshot[index] for index in self._cell_indexes), time()):
+            self.hass.bus.async_fire(CELL_EVENTS[change], {
+                "host": self.hostname,
+                **data
+            })
+
+    def _changed_keys(self, endpoint_key: str, value) -> set[tuple[str, str]]:
+        if self.data is None or endpoint_key in self.data.restored:
+            # a restored value was never written as fetched, every key counts as changed
+            previous = None
+        else:
+            previous = getattr(self.data, endpoint_key)
+        if value == previous:
+            return set()
+        changed = {(endpoint_key, None)}
+        if isinstance(value, dict):
+            if not isinstance(previous, dict):
+                previous = {}
+            changed.update(
+                (endpoint_key, data_key)
+                for data_key in value.keys() | previous.keys()
+                if value.get(data_key) != previous.get(data_key)
+            )
+        return changed
+
+    def provides(self, endpoint_key: str, data_key: str) -> bool:
+        """Return whether the router returns a key, True while the endpoint has no data yet."""
+        data = getattr(self.data, endpoint_key, None)
+        return not isinstance(data, dict) or data_key in data
+
+    def snapshot_index(self, endpoint_key: str, data_key: str, conversion_rate: float = None, numeric: bool = False) -> int:
+        """Return the index of a field in the snapshot, adding the field if needed.
+
+        The value is divided by conversion_rate, or parsed as a number if
+        numeric, once per poll. Fields the router did not return are MISSING.
+        """
+        index = self._schema.add(endpoint_key, data_key, conversion_rate, numeric)
+        if self.data is not None and index == len(self.data.snapshot.values):
+            # added after the last poll, convert the value it already returned
+            self.data.snapshot.values.append(self._schema.field(index).convert(getattr(self.data, endpoint_key)))
+        return index
+
+    @callback
+    def async_add_consumer(self, endpoint_key: str, data_key: str = None) -> Callable[[], None]:
+        """Register an entity reading data_key of endpoint_key.
+
+        Endpoints without any consumer are not fetched. Returns a callback
+        that removes the consumer again.
+        """
+        consumer = (endpoint_key, data_key)
+        self._consumers[consumer] += 1
+        if not self._is_fresh(endpoint_key, monotonic()):
+            # the endpoint was skipped while nobody read it, fetch it right away
+            self.hass.async_create_task(self.async_request_refresh())
+
+        @callback
+        def remove_consumer() -> None:
+            self._consumers[consumer] -= 1
+            if self._consumers[consumer] <= 0:
+                del self._consumers[consumer]
+
+        return remove_consumer
+
+    def _is_fresh(self, endpoint_key: str, now: float) -> bool:
+        if endpoint_key not in self._last_fetch:
+            return False
+        # Endpoints that become due within half a tick are fetched now, so
+        # timer jitter does not push them back by a whole tick.
+        slack = self.update_interval.total_seconds() / 2
+        return now - self._last_fetch[endpoint_key] < self._interval(endpoint_key) - slack
+
+    def _interval(self, endpoint_key: str) -> float:
+        """Return the current polling interval of an endpoint in seconds."""
+        if self._adaptive and endpoint_key in ADAPTIVE_ENDPOINTS:
+            return self._scheduler.interval(self._intervals[endpoint_key])
+        return self._intervals[endpoint_key]
+
+    def _tick(self) -> float:
+        return min(self._interval(endpoint_key) for endpoint_key in self._intervals)
+
+    def _due_endpoints(self) -> list[str]:
+        now = monotonic()
+        consumed = {endpoint_key for endpoint_key, _ in self._consumers}
+        # Every endpoint is fetched once so that data is there when entities
+        # are set up, after that only endpoints that entities read.
+        return [
+            endpoint_key
+            for endpoint_key in self._intervals
+            if not self._is_fresh(endpoint_key, now) and (endpoint_key in consumed or endpoint_key not in self._last_fetch)
+        ]
+
+    async def _async_fetch_endpoint(self, fetcher):
+        async with asyncio.timeout(ENDPOINT_TIMEOUT):
+            return await fetcher()
 
     async def reboot(self):
-        await self.api.login(password=self._password)
         await self.api.reboot()
+        self.hass.bus.async_fire(EVENT_REBOOT, {"host": self.hostname, "status": "rebooting"})
+        self.config_entry.async_create_background_task(
+            self.hass, self._async_wait_for_reboot(), f"{DOMAIN} reboot {self.hostname}"
+        )
+
+    async def _async_wait_for_reboot(self) -> None:
+        """Probe the router until it is back from a reboot, then refresh right away."""
+        start = monotonic()
+        await asyncio.sleep(REBOOT_GRACE)
+        while monotonic() - start < REBOOT_TIMEOUT:
+            await asyncio.sleep(max(self.api.breaker.retry_in(), 1))
+            if await self.api.probe():
+                duration = round(monotonic() - start)
+                _LOGGER.info("%s is back after rebooting for %s seconds", self.hostname, duration)
+                self.hass.bus.async_fire(EVENT_REBOOT, {"host": self.hostname, "status": "online", "duration": duration})
+                self._last_fetch.clear()
+                await self.async_refresh()
+                return
+        _LOGGER.warning("%s is not back %s seconds after rebooting", self.hostname, REBOOT_TIMEOUT)
+        self.api.breaker.recovering = False
+        self.hass.bus.async_fire(EVENT_REBOOT, {"host": self.hostname, "status": "timeout", "duration": REBOOT_TIMEOUT})
+
+    def sendMessage(self, addresses: list[str], message: str) -> list[str]:
+        """Queue a message for the given numbers and return the ids of the queued messages."""
+        return self.outbox.enqueue(addresses, message)
+
+    async def deleteMessages(self, **selection) -> list[str]:
+        """Delete the router messages matching the selection and return their ids."""
+        ids = select_messages(self.api.getCachedSMSMessages(), **selection)
+        if ids:
+            await self.api.deleteSMSMessages(ids)
+            await self._async_refresh_messages()
+        return ids
+
+    async def markMessagesRead(self, **selection) -> list[str]:
+        """Mark the unread router messages matching the selection as read and return their ids."""
+        ids = select_messages(self.api.getCachedSMSMessages(), **selection, read=False)
+        if ids:
+            await self.api.markSMSMessagesRead(ids)
+            await self._async_refresh_messages()
+        return ids
+
+    def ubusAllowed(self, endpoint: str, method: str) -> bool:
+        """Return whether call_ubus may call a method, it has to match the allowlist if set and not the denylist."""
+        if self._ubus_allowlist and not any(_ubus_matches(endpoint, method, pattern) for pattern in self._ubus_allowlist):
+            return False
+        return not any(_ubus_matches(endpoint, method, pattern) for pattern in self._ubus_denylist)
+
+    async def callUbus(self, endpoint: str, method: str, params: dict, max_age: float):
+        """Call a ubus method on the current session, reusing a result at most max_age seconds old."""
+        key = (endpoint, method, json.dumps(params, sort_keys=True))
+        return await self.ubus_cache.get(key, max_age, lambda: self.api.callMethod(endpoint, method, params))
+
+    async def captureTraffic(self, limit: int, duration: float) -> str:
+        """Record sanitized calls until limit calls or duration seconds, write them to a file and return its path."""
+        capture = self.api.capture = TrafficCapture(limit)
+        try:
+            async with asyncio.timeout(duration):
+                await capture.done.wait()
+        except TimeoutError:
+            pass
+        finally:
+            self.api.capture = None
+        path = self.hass.config.path(f"{DOMAIN}_capture_{slugify(self.hostname)}_{int(capture.started)}.json.gz")
+        data = capture.as_dict()
+        await self.hass.async_add_executor_job(write_capture, path, data)
+        self.last_capture = {"path": path, **data}
+        _LOGGER.info("Captured %s calls of %s to %s", len(capture.calls), self.hostname, path)
+        return path
 
-    async def sendMessage(self, address: str, message: str):
-        await self.api.login(password=self._password)
-        await self.api.sendSMSMessage(address, message)
+    async def _async_refresh_messages(self) -> None:
+        # the listing changed, fetch it right away even if it is not due
+        self._last_fetch.pop("sms_messages", None)
+        await self.async_refresh()
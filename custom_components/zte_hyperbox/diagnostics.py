@@ -0,0 +1,43 @@
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import HyperboxCoordinator
+
+TO_REDACT = {CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: HyperboxCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ].coordinator
+    data = coordinator.data
+    return {
+        "entry": {
+            "data": async_redact_data(config_entry.data, TO_REDACT),
+            "options": dict(config_entry.options),
+        },
+        "last_update_success": coordinator.last_update_success,
+        "stale_endpoints": sorted(data.stale) if data is not None else None,
+        "restored_endpoints": sorted(data.restored) if data is not None else None,
+        "circuit": coordinator.api.breaker.as_dict(),
+        "metrics": coordinator.api.metrics.as_dict(),
+        "ubus_cache": coordinator.ubus_cache.as_dict(),
+        "request_gates": {
+            "router": coordinator.api.gate.as_dict(),
+            # shared with the other routers
+            "shared": coordinator.api.shared_gate.as_dict(),
+        },
+        "cells": coordinator.cells.history(),
+        "capture": {
+            "running": coordinator.api.capture is not None,
+            "calls": len(coordinator.api.capture.calls) if coordinator.api.capture is not None else None,
+            # sanitized when recorded
+            "last": coordinator.last_capture,
+        },
+    }
@@ -0,0 +1,58 @@
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import HyperboxCoordinator
+from .snapshot import MISSING
+
+
+class HyperboxEntity(CoordinatorEntity):
+    """Base class for entities that read one endpoint of the coordinator data."""
+
+    _attr_should_poll = False
+    _attr_has_entity_name = True
+    # endpoint and key the entity reads from, None if it does not read any data
+    _endpoint_key: str = None
+    _data_key: str = None
+    # index of the value in the coordinator snapshot, None if the entity does not read one
+    _snapshot_index: int = None
+
+    def __init__(self, coordinator: HyperboxCoordinator) -> None:
+        super().__init__(coordinator)
+        self.device_info = coordinator.device_info
+        self._written_available: bool = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if self._endpoint_key is not None:
+            # let the coordinator know this data is needed, so the endpoint gets polled
+            self.async_on_remove(self.coordinator.async_add_consumer(self._endpoint_key, self._data_key))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Only write state when the value the entity reads changed,
+        # or when the entity became available or unavailable.
+        available = self.available
+        changed = available and self._has_changed()
+        if changed or available != self._written_available:
+            self._written_available = available
+            self.async_write_ha_state()
+
+    def _has_changed(self) -> bool:
+        """Return True if the data this entity reads changed in the last update."""
+        if self._endpoint_key is None:
+            return False
+        return (self._endpoint_key, self._data_key) in self.coordinator.data.changed
+
+    @property
+    def _value(self):
+        return self.coordinator.data.snapshot[self._snapshot_index]
+
+    @property
+    def available(self) -> bool:
+        """Return False if the endpoint this entity reads from failed on the last poll.
+
+        Also False if the router did not return the value the entity reads.
+        """
+        if not super().available or self._endpoint_key in self.coordinator.data.stale:
+            return False
+        return self._snapshot_index is None or self._value is not MISSING
@@ -0,0 +1,135 @@
+from array import array
+from math import ceil, inf
+
+# samples kept per field, an hour at a 5 second interval
+HISTORY_SIZE = 720
+# fields sampled from the endpoints, by name, with the endpoint and key they come
+# from and the factor that converts the raw value
+HISTORY_FIELDS = {
+    "real_rx_speed": ("network_statistics", "real_rx_speed", 8 / 1000000),
+    "real_tx_speed": ("network_statistics", "real_tx_speed", 8 / 1000000),
+    "lte_rsrp": ("network_info", "lte_rsrp", 1),
+    "lte_snr": ("network_info", "lte_snr", 1),
+    "nr5g_rsrp": ("network_info", "nr5g_rsrp", 1),
+    "nr5g_snr": ("network_info", "nr5g_snr", 1),
+}
+# fields derived from the deltas of byte counters, in Mbit/s
+RATE_FIELDS = {
+    "rx_rate": ("network_statistics", "real_rx_bytes"),
+    "tx_rate": ("network_statistics", "real_tx_bytes"),
+}
+AGGREGATES = ("min", "mean", "max", "p95")
+
+
+class SampleBuffer:
+    """Fixed-size ring buffer of (timestamp, value) samples backed by arrays."""
+
+    __slots__ = ("_times", "_values", "_next", "_count")
+
+    def __init__(self, size: int = HISTORY_SIZE) -> None:
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, value: float) -> None:
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._times)
+        self._count = min(self._count + 1, len(self._times))
+
+    def _indexes(self):
+        size = len(self._times)
+        start = (self._next - self._count) % size
+        return ((start + offset) % size for offset in range(self._count))
+
+    def samples(self, since: float = None) -> list[tuple[float, float]]:
+        """Return the samples from since on, oldest first."""
+        return [
+            (self._times[index], self._values[index])
+            for index in self._indexes()
+            if since is None or self._times[index] >= since
+        ]
+
+
+def _number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SampleHistory:
+    """Recent samples of throughput and signal fields, kept in memory only.
+
+    Every poll adds one sample per field of the fetched endpoints. Rates
+    are derived from the byte counters, a counter that went backwards
+    (router reboot or reset) starts over without a sample.
+    """
+
+    def __init__(self, window: float, size: int = HISTORY_SIZE) -> None:
+        self.window = window
+        self._buffers = {name: SampleBuffer(size) for name in (*HISTORY_FIELDS, *RATE_FIELDS)}
+        # (timestamp, value) of the last reading of each byte counter
+        self._counters: dict[str, tuple[float, float]] = {}
+        # (window start, latest window start with the same samples, aggregates) by field,
+        # dropped when a sample is added
+        self._aggregates: dict[str, tuple[float, float, dict[str, float] | None]] = {}
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return tuple(self._buffers)
+
+    def record(self, endpoint_key: str, data: dict, timestamp: float) -> None:
+        if not isinstance(data, dict):
+            return
+        for name, (field_endpoint, data_key, factor) in HISTORY_FIELDS.items():
+            if field_endpoint == endpoint_key:
+                value = _number(data.get(data_key))
+                if value is not None:
+                    self._add(name, timestamp, value * factor)
+        for name, (field_endpoint, data_key) in RATE_FIELDS.items():
+            if field_endpoint != endpoint_key:
+                continue
+            value = _number(data.get(data_key))
+            if value is None:
+                continue
+            previous = self._counters.get(name)
+            self._counters[name] = (timestamp, value)
+            if previous is None or timestamp <= previous[0] or value < previous[1]:
+                continue
+            self._add(name, timestamp, (value - previous[1]) / (timestamp - previous[0]) * 8 / 1000000)
+
+    def _add(self, name: str, timestamp: float, value: float) -> None:
+        self._buffers[name].append(timestamp, value)
+        self._aggregates.pop(name, None)
+
+    def samples(self, name: str, since: float = None) -> list[tuple[float, float]]:
+        return self._buffers[name].samples(since)
+
+    def aggregates(self, name: str, now: float) -> dict[str, float] | None:
+        """Return min, mean, max and p95 of the field over the window, None without samples."""
+        since = now - self.window
+        cached = self._aggregates.get(name)
+        # the window still holds the same samples while its start has not passed the oldest of them
+        if cached is not None and cached[0] <= since <= cached[1]:
+            return cached[2]
+        samples = self._buffers[name].samples(since)
+        if not samples:
+            result = None
+            expires = inf
+        else:
+            values = sorted(value for _, value in samples)
+            result = {
+                "min": values[0],
+                "mean": sum(values) / len(values),
+                "max": values[-1],
+                # nearest rank
+                "p95": values[ceil(0.95 * len(values)) - 1],
+            }
+            expires = samples[0][0]
+        self._aggregates[name] = (since, expires, result)
+        return result
@@ -0,0 +1,102 @@
+from bisect import bisect_left
+from collections import Counter, deque
+from statistics import quantiles
+
+# upper bounds in milliseconds of the latency histogram buckets, the last bucket is open
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# number of recent polls used for the poll duration percentiles
+POLL_HISTORY = 100
+
+
+class CallMetrics:
+    """Latency histogram and error counts of one ubus (endpoint, method)."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "buckets", "errors")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.errors: Counter[str] = Counter()
+
+    def record(self, duration_ms: float, error: str = None) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS, duration_ms)] += 1
+        if error is not None:
+            self.errors[error] += 1
+
+    def as_dict(self) -> dict:
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "histogram": dict(zip(labels, self.buckets)),
+            "errors": dict(self.errors),
+        }
+
+
+class APIMetrics:
+    """Counters of the requests an API instance sent and the polls that used them."""
+
+    def __init__(self) -> None:
+        self.calls: dict[tuple[str, str], CallMetrics] = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.logins = 0
+        self.polls = 0
+        self.failed_polls = 0
+        self.consecutive_failures = 0
+        self._poll_durations: deque[float] = deque(maxlen=POLL_HISTORY)
+
+    def record_request(self, bytes_sent: int, bytes_received: int) -> None:
+        self.requests += 1
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+
+    def record_call(self, endpoint: str, method: str, duration_ms: float, error: str = None) -> None:
+        metrics = self.calls.get((endpoint, method))
+        if metrics is None:
+            metrics = self.calls[(endpoint, method)] = CallMetrics()
+        metrics.record(duration_ms, error)
+
+    def record_login(self) -> None:
+        self.logins += 1
+
+    def record_poll(self, duration_ms: float, success: bool) -> None:
+        self.polls += 1
+        self._poll_durations.append(duration_ms)
+        if success:
+            self.consecutive_failures = 0
+        else:
+            self.failed_polls += 1
+            self.consecutive_failures += 1
+
+    def poll_duration(self, percentile: int) -> float | None:
+        """Return the given percentile of the recent poll durations in milliseconds."""
+        if not self._poll_durations:
+            return None
+        if len(self._poll_durations) == 1:
+            return round(self._poll_durations[0], 1)
+        return round(quantiles(self._poll_durations, n=100, method="inclusive")[percentile - 1], 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "logins": self.logins,
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "consecutive_failures": self.consecutive_failures,
+            "poll_duration_p50_ms": self.poll_duration(50),
+            "poll_duration_p95_ms": self.poll_duration(95),
+            "calls": {
+                f"{endpoint}.{method}": metrics.as_dict()
+                for (endpoint, method), metrics in self.calls.items()
+            },
+        }
@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from heapq import heappop, heappush
+from itertools import count
+
+
+class RequestPriority(IntEnum):
+    """Order in which waiting requests are sent, lower goes first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class RequestGate:
+    """Lets a limited number of requests run at once.
+
+    Requests that have to wait are let through by priority, then in the
+    order they arrived.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._active = 0
+        # (priority, arrival, future) of the waiting requests
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._arrival = count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    @asynccontextmanager
+    async def __call__(self, priority: RequestPriority = RequestPriority.BACKGROUND):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.BACKGROUND) -> None:
+        while self._waiters and self._waiters[0][2].done():
+            # drop cancelled waiters so they do not block the fast path
+            heappop(self._waiters)
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heappush(self._waiters, (priority, next(self._arrival), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just before the cancellation, pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self._active -= 1
+        while self._waiters and self._active < self._limit:
+            _, _, future = heappop(self._waiters)
+            if future.done():
+                # the waiter was cancelled
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def as_dict(self) -> dict:
+        return {
+            "limit": self._limit,
+            "active": self._active,
+            "waiting": self.waiting,
+        }
@@ -0,0 +1,98 @@
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# endpoints whose polling interval adapts to how fast their values change
+ADAPTIVE_ENDPOINTS = ("network_info", "network_statistics")
+# a change of any of these is a handover or band change, poll at the shortest interval
+HANDOVER_KEYS = ("cell_id", "lte_pci", "nr5g_cell_id", "nr5g_pci", "network_type", "wan_active_band", "nr5g_action_band")
+# signal keys and the step (dB) from which a change counts as large or moderate
+SIGNAL_STEPS = {
+    "lte_rsrp": (6, 3),
+    "nr5g_rsrp": (6, 3),
+    "lte_snr": (5, 2),
+    "nr5g_snr": (5, 2),
+}
+# throughput keys and the relative change that counts as moderate
+THROUGHPUT_KEYS = ("real_rx_speed", "real_tx_speed")
+THROUGHPUT_STEP = 0.5
+# polls without a notable change before the interval is stretched
+STABLE_POLLS = 3
+# factor the interval is stretched or shortened by
+STEP_FACTOR = 1.5
+# failed polls in a row after which the backoff stops doubling, far beyond any max_interval
+MAX_BACKOFF_DOUBLINGS = 16
+
+
+def _number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveScheduler:
+    """Scale of the polling interval of the radio endpoints.
+
+    The scale drops to the shortest interval on a handover or a large
+    signal swing, shrinks on moderate changes and grows slowly while the
+    values stay stable. Intervals are always kept between the bounds.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.scale = 1.0
+        self._stable = 0
+
+    def interval(self, base: float) -> float:
+        return min(self.max_interval, max(self.min_interval, base * self.scale))
+
+    def observe(self, endpoint_key: str, previous: dict, current: dict) -> None:
+        """Adjust the scale to the change between two values of an endpoint."""
+        if not isinstance(previous, dict) or not isinstance(current, dict):
+            return
+        change = self._classify(endpoint_key, previous, current)
+        if change == "large":
+            _LOGGER.debug("%s changed sharply, polling at the shortest interval", endpoint_key)
+            self.scale = 0.0
+            self._stable = 0
+        elif change == "moderate":
+            self.scale = self.scale / STEP_FACTOR
+            self._stable = 0
+        else:
+            self._stable += 1
+            if self._stable >= STABLE_POLLS:
+                # start stretching from the shortest interval after a sharp change
+                self.scale = max(self.scale, 1 / STEP_FACTOR ** 4) * STEP_FACTOR
+                self._stable = 0
+        # there is no point in stretching further than the longest interval allows
+        self.scale = min(self.scale, self.max_interval / self.min_interval)
+
+    def _classify(self, endpoint_key: str, previous: dict, current: dict) -> str:
+        if endpoint_key == "network_info":
+            if any(previous.get(key) != current.get(key) for key in HANDOVER_KEYS):
+                return "large"
+            moderate = False
+            for key, (large_step, moderate_step) in SIGNAL_STEPS.items():
+                before = _number(previous.get(key))
+                after = _number(current.get(key))
+                if before is None or after is None:
+                    continue
+                if abs(after - before) >= large_step:
+                    return "large"
+                if abs(after - before) >= moderate_step:
+                    moderate = True
+            return "moderate" if moderate else "stable"
+        for key in THROUGHPUT_KEYS:
+            before = _number(previous.get(key))
+            after = _number(current.get(key))
+            if before is None or after is None:
+                continue
+            if abs(after - before) > THROUGHPUT_STEP * max(before, after, 1):
+                return "moderate"
+        return "stable"
+
+    def backoff(self, interval: float, failures: int) -> float:
+        """Return the interval to wait after the given number of failed polls in a row."""
+        return min(self.max_interval, interval * 2 ** min(failures, MAX_BACKOFF_DOUBLINGS))
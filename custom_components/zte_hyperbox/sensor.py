@@ -6,16 +6,164 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.const import EntityCategory, UnitOfInformation, SIGNAL_STRENGTH_DECIBELS, SIGNAL_STRENGTH_DECIBELS_MILLIWATT, UnitOfTime
+from homeassistant.const import EntityCategory, UnitOfDataRate, UnitOfInformation, SIGNAL_STRENGTH_DECIBELS, SIGNAL_STRENGTH_DECIBELS_MILLIWATT, UnitOfTime
+from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
+from time import time
 
-from .const import DOMAIN
+from .carrier import Carrier
+from .history import AGGREGATES, HISTORY_FIELDS, RATE_FIELDS
+from .const import (
+    DOMAIN,
+    CONF_SIGNAL_DEADBAND,
+    DEFAULT_SIGNAL_DEADBAND,
+    CONF_SMS_ATTRIBUTE_MESSAGES,
+    DEFAULT_SMS_ATTRIBUTE_MESSAGES,
+    CONF_UNKNOWN_KEYS,
+    DEFAULT_UNKNOWN_KEYS,
+)
+from .binary_sensor import BINARY_SENSOR_DESCRIPTIONS
 from .coordinator import HyperboxCoordinator
+from .entity import HyperboxEntity
 
 _LOGGER = logging.getLogger(__name__)
 
+# network info polls a carrier has to be gone for before its sensors are removed
+CARRIER_REMOVE_POLLS = 3
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class HyperboxSensorDescription:
+    """A value of an endpoint and how its sensor shows it."""
+
+    endpoint_key: str
+    data_key: str
+    unit: str = None
+    # the raw value is divided by this
+    conversion_rate: float = None
+    icon: str = None
+    # enabled by default
+    visible: bool = True
+    category: EntityCategory = None
+    state_class: str = None
+    precision: int = None
+    # signal values, written only when they moved by more than the configured deadband
+    signal: bool = False
+    # named by the translations, else by the data key
+    translated: bool = True
+
+
+# Sensors of the endpoint values, only created for the keys the router returns
+SENSOR_DESCRIPTIONS: tuple[HyperboxSensorDescription, ...] = (
+    #📶 Netzwerkauswahl & -typ
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="network_type"), #Aktueller Verbindungstyp
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="domain_stat"), #Netzdomäne
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="net_select"), #Netzpräferenz
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="net_select_mode"), #Modus der Netzauswahl
+    #📡 Signalstärke & Qualität
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="signalbar", state_class=SensorStateClass.MEASUREMENT), #Signalbalken-Anzeige
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lte_rsrp", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #LTE Signalstärke
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lte_rsrq", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #LTE Empfangsqualität
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lte_rssi", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #LTE RSSI
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lte_snr", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #LTE SNR
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_rsrp", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #5G RSRP
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_rsrq", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #5G RSRQ
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_snr", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #5G SNR
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_rssi", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC, signal=True), #5G RSSI
+    #🌍 Roaming & Netzbetreiber
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="rmcc"), #Roaming Mobile Country Code (Land)
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="rmnc"), #Roaming Mobile Network Code (Provider)
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="network_provider"), #Netzname kurz
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="network_provider_fullname"), #Netzname lang
+    #📶 Zellinformationen
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="cell_id"), #LTE Cell ID
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lte_pci"), #LTE Physical Cell ID
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="wan_active_band"), #Aktives LTE-Band
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="wan_active_channel"), #Aktiver LTE-Kanal
+    #📡 5G-spezifisch
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_cell_id"), #5G Cell ID
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_pci"), #5G Physical Cell ID
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_action_channel"), #5G Betriebsfrequenz (ARFCN)
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_action_band"), #5G Band
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_bandwidth", visible=False), #5G Bandbreite
+    #📶 Carrier Aggregation (CA)
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="ltecasig", visible=False), #LTE CA Signalinfo (RSRP/SNR pro Band)
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lteca", visible=False), #LTE CA Konfiguration
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nrca", visible=False), #5G Carrier Aggregation Info
+    #🔒 Netzsperren
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lock_lte_cell", visible=False), #LTE-Zellsperre
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lock_nr_cell", visible=False), #5G-Zellsperre
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="lte_band_lock", visible=False), #LTE-Band-Sperrmaske (hex)
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="gw_band_lock", visible=False), #GSM/WCDMA Bandlock
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nr5g_sa_band_lock", visible=False), #5G SA Band Lock Liste
+    #🕒 NITZ & Zeitsynchronisation
+    HyperboxSensorDescription(endpoint_key="network_info", data_key="nitz_timezone"), #Zeitzone laut NITZ
+    #📡 Verbindung & Datenverkehr (aktuelle Sitzung)
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="cid"), #Connection ID (Zelle / WWAN-Slot)
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_time", conversion_rate=3600, unit=UnitOfTime.HOURS, precision=2), #Aktuelle Betriebszeit
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_tx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Gesendete Bytes seit Neustart
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_rx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Empfangene Bytes seit Neustart
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_tx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Gesendete Pakete (aktuell)
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_rx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Empfangene Pakete (aktuell)
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_tx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Verlorene (nicht gesendete) Pakete
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_rx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Empfangsverluste (Pakete verworfen)
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_tx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Sende-Fehlerpakete
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_rx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Empfangs-Fehlerpakete
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_tx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, state_class=SensorStateClass.MEASUREMENT, precision=2), #Aktuelle Uploadrate
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_rx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, state_class=SensorStateClass.MEASUREMENT, precision=2), #Aktuelle Downloadrate
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_max_tx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, precision=2), #Maximale Uploadrate seit Neustart
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="real_max_rx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, precision=2), #Maximale Downloadrate seit Neustart
+    #📅 Monatsdaten
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_tx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Upload gesamt im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_rx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Download gesamt im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_tx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Pakete im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_rx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Pakete im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_tx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Verluste im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_rx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Verluste im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_tx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Fehler im Monat
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="month_rx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Fehler im Monat
+    #🧮 Gesamtdaten (Gerätelebensdauer)
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_tx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Upload gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_rx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Download gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_tx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Pakete gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_rx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Pakete gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_tx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Verluste gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_rx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Verluste gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_tx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Fehler gesamt
+    HyperboxSensorDescription(endpoint_key="network_statistics", data_key="total_rx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Fehler gesamt
+)
+
+# values of unknown keys longer than this are not shown, Home Assistant limits states to 255 characters
+MAX_UNKNOWN_VALUE_LENGTH = 255
+
+
+def _unknown_key_descriptions(coordinator: HyperboxCoordinator) -> list[HyperboxSensorDescription]:
+    """Return descriptions of disabled sensors for the plain values nothing else reads."""
+    known = {
+        (description.endpoint_key, description.data_key)
+        for description in (*SENSOR_DESCRIPTIONS, *BINARY_SENSOR_DESCRIPTIONS)
+    }
+    descriptions = []
+    for endpoint_key in ("network_info", "network_statistics"):
+        data = getattr(coordinator.data, endpoint_key)
+        if not isinstance(data, dict):
+            continue
+        for data_key, value in data.items():
+            if (endpoint_key, data_key) in known or not isinstance(value, (str, int, float)):
+                continue
+            if len(str(value)) > MAX_UNKNOWN_VALUE_LENGTH:
+                continue
+            descriptions.append(HyperboxSensorDescription(
+                endpoint_key=endpoint_key,
+                data_key=data_key,
+                visible=False,
+                category=EntityCategory.DIAGNOSTIC,
+                translated=False,
+            ))
+    return descriptions
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -26,126 +174,173 @@ async def async_setup_entry(
     coordinator: HyperboxCoordinator = hass.data[DOMAIN][
         config_entry.entry_id
     ].coordinator
+    # Signal values that moved by less than this are not written, 0 writes every change
+    signal_deadband = config_entry.options.get(CONF_SIGNAL_DEADBAND, DEFAULT_SIGNAL_DEADBAND) or None
     # Enumerate all the sensors in your data value from your DataUpdateCoordinator and add an instance of your sensor class
     # to a list for each one.
     # This maybe different in your specific case, depending on how your data is structured
     sensors = [
-        MessageSensor(coordinator),
-        #📶 Netzwerkauswahl & -typ
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="network_type"), #Aktueller Verbindungstyp
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="domain_stat"), #Netzdomäne
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="net_select"), #Netzpräferenz
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="net_select_mode"), #Modus der Netzauswahl
-        #📡 Signalstärke & Qualität
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="signalbar", state_class=SensorStateClass.MEASUREMENT), #Signalbalken-Anzeige
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lte_rsrp", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #LTE Signalstärke
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lte_rsrq", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #LTE Empfangsqualität
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lte_rssi", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #LTE RSSI
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lte_snr", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #LTE SNR
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_rsrp", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #5G RSRP
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_rsrq", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #5G RSRQ
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_snr", unit=SIGNAL_STRENGTH_DECIBELS, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #5G SNR
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_rssi", unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT, state_class=SensorStateClass.MEASUREMENT, category=EntityCategory.DIAGNOSTIC), #5G RSSI
-        #🌍 Roaming & Netzbetreiber
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="rmcc"), #Roaming Mobile Country Code (Land)
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="rmnc"), #Roaming Mobile Network Code (Provider)
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="network_provider"), #Netzname kurz
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="network_provider_fullname"), #Netzname lang
-        #📶 Zellinformationen
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="cell_id"), #LTE Cell ID
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lte_pci"), #LTE Physical Cell ID
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="wan_active_band"), #Aktives LTE-Band
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="wan_active_channel"), #Aktiver LTE-Kanal
-        #📡 5G-spezifisch
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_cell_id"), #5G Cell ID
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_pci"), #5G Physical Cell ID
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_action_channel"), #5G Betriebsfrequenz (ARFCN)
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_action_band"), #5G Band
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_bandwidth", visible=False), #5G Bandbreite
-        #📶 Carrier Aggregation (CA)
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="ltecasig", visible=False), #LTE CA Signalinfo (RSRP/SNR pro Band)
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lteca", visible=False), #LTE CA Konfiguration
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nrca", visible=False), #5G Carrier Aggregation Info
-        #🔒 Netzsperren
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lock_lte_cell", visible=False), #LTE-Zellsperre
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lock_nr_cell", visible=False), #5G-Zellsperre
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="lte_band_lock", visible=False), #LTE-Band-Sperrmaske (hex)
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="gw_band_lock", visible=False), #GSM/WCDMA Bandlock
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nr5g_sa_band_lock", visible=False), #5G SA Band Lock Liste
-        #🕒 NITZ & Zeitsynchronisation
-        HyperboxSensor(coordinator, endpoint_key="network_info", data_key="nitz_timezone"), #Zeitzone laut NITZ
-        #📡 Verbindung & Datenverkehr (aktuelle Sitzung)
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="cid"), #Connection ID (Zelle / WWAN-Slot)
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_time", conversion_rate=3600, unit=UnitOfTime.HOURS, precision=2), #Aktuelle Betriebszeit
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_tx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Gesendete Bytes seit Neustart
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_rx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Empfangene Bytes seit Neustart
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_tx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Gesendete Pakete (aktuell)
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_rx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Empfangene Pakete (aktuell)
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_tx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Verlorene (nicht gesendete) Pakete
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_rx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Empfangsverluste (Pakete verworfen)
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_tx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Sende-Fehlerpakete
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_rx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Empfangs-Fehlerpakete
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_tx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, state_class=SensorStateClass.MEASUREMENT, precision=2), #Aktuelle Uploadrate
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_rx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, state_class=SensorStateClass.MEASUREMENT, precision=2), #Aktuelle Downloadrate
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_max_tx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, precision=2), #Maximale Uploadrate seit Neustart
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="real_max_rx_speed", conversion_rate=1000000/8, unit=UnitOfInformation.MEGABITS, precision=2), #Maximale Downloadrate seit Neustart
-        #📅 Monatsdaten
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_tx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Upload gesamt im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_rx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Download gesamt im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_tx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Pakete im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_rx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Pakete im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_tx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Verluste im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_rx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Verluste im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_tx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Fehler im Monat
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="month_rx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Fehler im Monat
-        #🧮 Gesamtdaten (Gerätelebensdauer)
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_tx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Upload gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_rx_bytes", conversion_rate=1073741824, unit=UnitOfInformation.GIGABYTES, precision=2), #Download gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_tx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Pakete gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_rx_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Pakete gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_tx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Verluste gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_rx_drop_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Verluste gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_tx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Upload-Fehler gesamt
-        HyperboxSensor(coordinator, endpoint_key="network_statistics", data_key="total_rx_error_packets", state_class=SensorStateClass.TOTAL_INCREASING), #Download-Fehler gesamt
+        MessageSensor(coordinator, config_entry.options.get(CONF_SMS_ATTRIBUTE_MESSAGES, DEFAULT_SMS_ATTRIBUTE_MESSAGES)),
+        *(
+            HyperboxSensor(coordinator, description, deadband=signal_deadband if description.signal else None)
+            for description in SENSOR_DESCRIPTIONS
+            if coordinator.provides(description.endpoint_key, description.data_key)
+        ),
+        #⏱️ Abfragestatistik
+        PollMetricSensor(coordinator, metric="poll_duration_p50", unit=UnitOfTime.MILLISECONDS, state_class=SensorStateClass.MEASUREMENT), #Abfragedauer Median
+        PollMetricSensor(coordinator, metric="poll_duration_p95", unit=UnitOfTime.MILLISECONDS, state_class=SensorStateClass.MEASUREMENT), #Abfragedauer 95. Perzentil
+        PollMetricSensor(coordinator, metric="consecutive_failures", state_class=SensorStateClass.MEASUREMENT), #Fehlgeschlagene Abfragen in Folge
+        #📈 Verlauf im Speicher (min/mittel/max/p95 über das Zeitfenster)
+        *(HistorySensor(coordinator, field="rx_rate", aggregate=aggregate, unit=UnitOfDataRate.MEGABITS_PER_SECOND) for aggregate in AGGREGATES), #Downloadrate aus Bytezähler
+        *(HistorySensor(coordinator, field="tx_rate", aggregate=aggregate, unit=UnitOfDataRate.MEGABITS_PER_SECOND) for aggregate in AGGREGATES), #Uploadrate aus Bytezähler
+        *(HistorySensor(coordinator, field="lte_rsrp", aggregate=aggregate, unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT) for aggregate in AGGREGATES), #LTE RSRP
+        *(HistorySensor(coordinator, field="lte_snr", aggregate=aggregate, unit=SIGNAL_STRENGTH_DECIBELS) for aggregate in AGGREGATES), #LTE SNR
+        *(HistorySensor(coordinator, field="nr5g_rsrp", aggregate=aggregate, unit=SIGNAL_STRENGTH_DECIBELS_MILLIWATT) for aggregate in AGGREGATES), #5G RSRP
+        *(HistorySensor(coordinator, field="nr5g_snr", aggregate=aggregate, unit=SIGNAL_STRENGTH_DECIBELS) for aggregate in AGGREGATES), #5G SNR
     ]
 
+    if config_entry.options.get(CONF_UNKNOWN_KEYS, DEFAULT_UNKNOWN_KEYS):
+        # disabled sensors for values this firmware returns that have no description
+        sensors.extend(HyperboxSensor(coordinator, description) for description in _unknown_key_descriptions(coordinator))
+
     # Create the sensors.
     async_add_entities(sensors)
 
-class HyperboxSensor(CoordinatorEntity):
+    # Sensors of the component carriers are added and removed as carriers come and go
+    _async_track_carriers(hass, config_entry, coordinator, async_add_entities)
+
+@callback
+def _async_track_carriers(hass: HomeAssistant, config_entry: ConfigEntry, coordinator: HyperboxCoordinator, async_add_entities: AddEntitiesCallback) -> None:
+    registry = er.async_get(hass)
+    prefix = f"{coordinator.hostname}-carrier-"
+    entities: dict[str, list[CarrierSensor]] = {}
+    # network info polls each carrier with sensors has been missing from
+    missing: Counter[str] = Counter()
+
+    # sensors of carriers that were active before the restart and are gone now
+    for entry in er.async_entries_for_config_entry(registry, config_entry.entry_id):
+        if entry.unique_id.startswith(prefix) and entry.unique_id.removeprefix(prefix).rsplit("-", 1)[0] not in coordinator.data.carriers:
+            registry.async_remove(entry.entity_id)
+
+    @callback
+    def update_carriers() -> None:
+        carriers = coordinator.data.carriers
+        new = []
+        for key, carrier in carriers.items():
+            missing.pop(key, None)
+            if key not in entities:
+                entities[key] = [CarrierSensor(coordinator, carrier, "rsrp"), CarrierSensor(coordinator, carrier, "snr")]
+                new.extend(entities[key])
+        if new:
+            async_add_entities(new)
+        if "network_info" not in coordinator.data.updated:
+            return
+        for key in [key for key in entities if key not in carriers]:
+            missing[key] += 1
+            if missing[key] < CARRIER_REMOVE_POLLS:
+                continue
+            del missing[key]
+            for entity in entities.pop(key):
+                if entity.entity_id is not None and registry.async_get(entity.entity_id) is not None:
+                    registry.async_remove(entity.entity_id)
+
+    update_carriers()
+    config_entry.async_on_unload(coordinator.async_add_listener(update_carriers))
+
+class HyperboxSensor(HyperboxEntity):
     
-    _attr_should_poll = False
-    _attr_has_entity_name = True
+    def __init__(self, coordinator: HyperboxCoordinator, description: HyperboxSensorDescription, deadband: float = None) -> None:
+        super().__init__(coordinator)
+        if description.translated:
+            self.translation_key = description.endpoint_key + "_" + description.data_key
+        else:
+            self._attr_name = description.data_key
+        self.entity_registry_enabled_default = description.visible
+        self._attr_unique_id = f"{coordinator.hostname}-{description.endpoint_key}-{description.data_key}"
+        self._endpoint_key = description.endpoint_key
+        self._data_key = description.data_key
+        self._state_class = description.state_class
+        # values with a unit or state class are measured, store them as numbers
+        self._snapshot_index = coordinator.snapshot_index(
+            description.endpoint_key,
+            description.data_key,
+            description.conversion_rate,
+            numeric=description.unit is not None or description.state_class is not None
+        )
+        self._deadband = deadband
+        self._written_value = None
+        if description.precision is not None:
+            self.suggested_display_precision = description.precision
+        if description.unit is not None:
+            self._attr_unit_of_measurement = description.unit
+        if description.icon is not None:
+            self._attr_icon = description.icon
+        if description.category is not None:
+            self._attr_entity_category = description.category
+
+    def _has_changed(self) -> bool:
+        if not super()._has_changed():
+            return False
+        if self._deadband is None:
+            return True
+        value = self.state
+        try:
+            if self._written_value is not None and abs(float(value) - float(self._written_value)) < self._deadband:
+                return False
+        except (TypeError, ValueError):
+            pass
+        self._written_value = value
+        return True
+
+    @property
+    def state(self):
+        return self._value
+    
+    @property
+    def extra_state_attributes(self):
+        attr = {}
+        if self._state_class is not None:
+            attr['state_class'] = self._state_class
+        if self._endpoint_key in self.coordinator.data.restored:
+            # saved by the last run, not fetched from the router yet
+            attr['restored'] = True
+        return attr
+
+class PollMetricSensor(HyperboxEntity):
+    
+    _attr_icon = "mdi:timer-outline"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
     
-    def __init__(self, coordinator: HyperboxCoordinator, endpoint_key: str, data_key: str, unit: str = None, conversion_rate: int = None, icon: str = None, visible: bool = True, category: str = None, state_class: str = None, precision: int = None) -> None:
+    def __init__(self, coordinator: HyperboxCoordinator, metric: str, unit: str = None, state_class: str = None) -> None:
         super().__init__(coordinator)
-        self.device_info = coordinator.device_info
-        self.translation_key = endpoint_key + "_" + data_key
-        self.entity_registry_enabled_default = visible
-        self._attr_unique_id = f"{coordinator.hostname}-{endpoint_key}-{data_key}"
-        self._endpoint_key = endpoint_key
-        self._data_key = data_key
+        self.translation_key = metric
+        self.entity_registry_enabled_default = False
+        self._attr_unique_id = f"{coordinator.hostname}-{metric}"
+        self._metric = metric
         self._state_class = state_class
-        self._conversion_rate = conversion_rate
-        if precision is not None:
-            self.suggested_display_precision = precision
+        self._written_value = None
         if unit is not None:
             self._attr_unit_of_measurement = unit
-        if icon is not None:
-            self._attr_icon = icon
-        if category is not None:
-            self._attr_entity_category = category
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-    
+    def _has_changed(self) -> bool:
+        # the metrics only change when a poll ran
+        value = self.state
+        if value == self._written_value:
+            return False
+        self._written_value = value
+        return True
+
+    @property
+    def available(self) -> bool:
+        # stays available while polls fail, that is when the metrics matter
+        return True
+
     @property
     def state(self):
-        value = getattr(self.coordinator.data, self._endpoint_key)[self._data_key]
-        if self._conversion_rate is not None:
-            value = value / self._conversion_rate
-        return value
+        metrics = self.coordinator.api.metrics
+        if self._metric == "consecutive_failures":
+            return metrics.consecutive_failures
+        return metrics.poll_duration(95 if self._metric == "poll_duration_p95" else 50)
     
     @property
     def extra_state_attributes(self):
@@ -154,32 +349,114 @@ class HyperboxSensor(CoordinatorEntity):
             attr['state_class'] = self._state_class
         return attr
 
-class MessageSensor(CoordinatorEntity):
+class HistorySensor(HyperboxEntity):
+    
+    _attr_icon = "mdi:chart-bell-curve"
+    
+    def __init__(self, coordinator: HyperboxCoordinator, field: str, aggregate: str, unit: str) -> None:
+        super().__init__(coordinator)
+        self.translation_key = f"history_{field}_{aggregate}"
+        self.entity_registry_enabled_default = False
+        self._attr_unique_id = f"{coordinator.hostname}-history-{field}-{aggregate}"
+        self._attr_unit_of_measurement = unit
+        self._endpoint_key = (HISTORY_FIELDS.get(field) or RATE_FIELDS[field])[0]
+        self._field = field
+        self._aggregate = aggregate
+        self._written_value = None
+
+    def _has_changed(self) -> bool:
+        # new samples move the window and old ones age out of it, also while the endpoint is not polled
+        value = self.state
+        if value == self._written_value:
+            return False
+        self._written_value = value
+        return True
+
+    @property
+    def available(self) -> bool:
+        return super().available and self.coordinator.history.aggregates(self._field, time()) is not None
+
+    @property
+    def state(self):
+        return round(self.coordinator.history.aggregates(self._field, time())[self._aggregate], 2)
+    
+    @property
+    def extra_state_attributes(self):
+        return {
+            'state_class': SensorStateClass.MEASUREMENT,
+            'window': self.coordinator.history.window,
+        }
+
+class MessageSensor(HyperboxEntity):
     
-    _attr_should_poll = False
-    _attr_has_entity_name = True
     _attr_icon = "mdi:mail"
+    _endpoint_key = "sms_messages"
     
-    def __init__(self, coordinator: HyperboxCoordinator) -> None:
+    def __init__(self, coordinator: HyperboxCoordinator, attribute_messages: int) -> None:
         super().__init__(coordinator)
-        self.device_info = coordinator.device_info
         self.translation_key = "messages"
         self._attr_unique_id = f"{coordinator.hostname}-{self.translation_key}"
+        self._attribute_messages = attribute_messages
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
-    
     @property
     def state(self):
         return len(self.coordinator.data.sms_messages)
     
     @property
     def extra_state_attributes(self):
+        # Only the latest messages, the full history is in the inbox store
+        # and can be queried with the get_sms_messages service.
         attr = {}
-        for index in range(len(self.coordinator.data.sms_messages)):
-            message = self.coordinator.data.sms_messages[index]
+        for index, message in enumerate(self.coordinator.inbox.latest(self._attribute_messages)):
             attr[f"message{index}_content"] = message['content']
             attr[f"message{index}_date"] = datetime.fromtimestamp(message['date'])
             attr[f"message{index}_number"] = message['number']
         return attr
+
+class CarrierSensor(HyperboxEntity):
+    
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:antenna"
+    _endpoint_key = "network_info"
+    
+    def __init__(self, coordinator: HyperboxCoordinator, carrier: Carrier, measurement: str) -> None:
+        super().__init__(coordinator)
+        self._key = carrier.key
+        self._measurement = measurement
+        self._attr_unique_id = f"{coordinator.hostname}-carrier-{carrier.key}-{measurement}"
+        band = f"B{carrier.band}" if carrier.rat == "lte" else f"n{carrier.band}"
+        self._attr_name = f"{carrier.rat.upper()} {band} {carrier.channel} {measurement.upper()}"
+        self._attr_unit_of_measurement = SIGNAL_STRENGTH_DECIBELS_MILLIWATT if measurement == "rsrp" else SIGNAL_STRENGTH_DECIBELS
+        self._written_carrier = None
+
+    @property
+    def _carrier(self) -> Carrier | None:
+        return self.coordinator.data.carriers.get(self._key)
+
+    def _has_changed(self) -> bool:
+        carrier = self._carrier
+        if carrier == self._written_carrier:
+            return False
+        self._written_carrier = carrier
+        return True
+
+    @property
+    def available(self) -> bool:
+        return super().available and self._carrier is not None
+
+    @property
+    def state(self):
+        return getattr(self._carrier, self._measurement)
+
+    @property
+    def extra_state_attributes(self):
+        carrier = self._carrier
+        if carrier is None:
+            return {'state_class': SensorStateClass.MEASUREMENT}
+        return {
+            'state_class': SensorStateClass.MEASUREMENT,
+            'band': carrier.band,
+            'channel': carrier.channel,
+            'pci': carrier.pci,
+            'bandwidth': carrier.bandwidth,
+        }
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+from time import time
+from uuid import uuid4
+
+from aiohttp import ClientError
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import API, APIAuthError, APIConnectionError, SMS_TAG_READ, SMS_TAG_UNREAD, SMS_TAG_SENT
+from .const import DOMAIN, EVENT_SMS_DELIVERY
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# seconds to wait before writing changes, so several polls end up in one write
+STORAGE_SAVE_DELAY = 10
+# received messages kept in the inbox, the oldest are dropped first
+SMS_STORE_SIZE = 200
+
+# attempts to send a message before it is reported as failed
+SMS_SEND_ATTEMPTS = 3
+# seconds before the first retry, doubled on every further retry
+SMS_RETRY_BACKOFF = 30
+
+# characters of the GSM 03.38 default alphabet, the extension characters take two septets
+GSM7_BASIC_CHARS = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENSION_CHARS = frozenset("\f^{}\\[~]|€")
+
+ENCODE_TYPE_GSM7 = "GSM7_default"
+ENCODE_TYPE_UCS2 = "UNICODE"
+
+
+class SMSInbox:
+    """Received SMS messages, stored once by id and persisted across restarts."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, max_size: int = SMS_STORE_SIZE) -> None:
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.sms_inbox")
+        self._max_size = max_size
+        # messages by id, in the order they were received
+        self._messages: dict[str, dict] = {}
+        # highest message id seen, messages up to this id are never reported as new again
+        self._last_id = None
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if data is None:
+            return
+        self._messages = {message['id']: message for message in data['messages']}
+        self._last_id = data['last_id']
+
+    def _data_to_save(self) -> dict:
+        return {
+            "last_id": self._last_id,
+            "messages": list(self._messages.values()),
+        }
+
+    def update(self, messages: list[dict]) -> list[dict]:
+        """Add the messages not seen before and return them.
+
+        The first update of an empty inbox only records the messages that are
+        already on the router and does not report them as new.
+        """
+        first_sync = self._last_id is None
+        new = []
+        for message in sorted(messages, key=lambda message: int(message['id'])):
+            if self._last_id is not None and int(message['id']) <= self._last_id:
+                continue
+            stored = {
+                "id": str(message['id']),
+                "number": message['number'],
+                "content": message['content'],
+                "date": message['date'],
+            }
+            self._messages[stored['id']] = stored
+            self._last_id = int(message['id'])
+            new.append(stored)
+
+        if first_sync and self._last_id is None:
+            # nothing on the router yet, every message from now on is new
+            self._last_id = -1
+        if not new and not first_sync:
+            return []
+
+        while len(self._messages) > self._max_size:
+            del self._messages[next(iter(self._messages))]
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+        return [] if first_sync else new
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def captured(self, id: str) -> bool:
+        """Return whether a received message has been added to the inbox, or was on the router before it."""
+        return self._last_id is not None and int(id) <= self._last_id
+
+    def latest(self, count: int) -> list[dict]:
+        """Return the newest messages, newest first."""
+        return self.page(0, count)
+
+    def page(self, page: int, page_size: int) -> list[dict]:
+        """Return one page of messages, newest first."""
+        messages = list(reversed(self._messages.values()))
+        return messages[page * page_size:(page + 1) * page_size]
+
+
+def select_messages(messages: list[dict], ids: list[str] = None, older_than: float = None, number: str = None, read: bool = None) -> list[str]:
+    """Return the ids of the router messages that match every given filter.
+
+    older_than is in seconds. read only matches received messages, read or
+    unread, sent messages never match it.
+    """
+    ids = {str(id) for id in ids} if ids is not None else None
+    before = time() - older_than if older_than is not None else None
+    selected = []
+    for message in messages:
+        if ids is not None and str(message['id']) not in ids:
+            continue
+        if before is not None and message['date'] >= before:
+            continue
+        if number is not None and message['number'] != number:
+            continue
+        if read is not None and message['tag'] != (SMS_TAG_READ if read else SMS_TAG_UNREAD):
+            continue
+        selected.append(str(message['id']))
+    return selected
+
+
+def prune_messages(messages: list[dict], inbox: SMSInbox, limit: int) -> list[str]:
+    """Return the ids of the oldest router messages over the limit.
+
+    Received messages are only pruned once they are in the local inbox,
+    sent messages are never stored locally and pruned as they are.
+    """
+    selected = []
+    excess = len(messages) - limit
+    for message in messages:
+        if len(selected) >= excess:
+            break
+        if message['tag'] == SMS_TAG_SENT or inbox.captured(message['id']):
+            selected.append(str(message['id']))
+    return selected
+
+
+def split_message(text: str) -> tuple[list[str], str]:
+    """Split a text into SMS segments and return them with their encode type.
+
+    Text that fits the GSM 7-bit alphabet is sent as GSM-7 with 160 septets
+    per SMS, or 153 per segment once it has to be split. Anything else falls
+    back to UCS-2 with 70 UTF-16 code units per SMS, or 67 per segment.
+    """
+    if all(char in GSM7_BASIC_CHARS or char in GSM7_EXTENSION_CHARS for char in text):
+        encode_type = ENCODE_TYPE_GSM7
+        single, segment = 160, 153
+        length = lambda char: 2 if char in GSM7_EXTENSION_CHARS else 1
+    else:
+        encode_type = ENCODE_TYPE_UCS2
+        single, segment = 70, 67
+        length = lambda char: 2 if ord(char) > 0xFFFF else 1
+
+    if sum(length(char) for char in text) <= single:
+        return [text], encode_type
+    segments = []
+    current = []
+    used = 0
+    for char in text:
+        # never split an escape sequence or a surrogate pair across segments
+        if used + length(char) > segment:
+            segments.append("".join(current))
+            current = []
+            used = 0
+        current.append(char)
+        used += length(char)
+    segments.append("".join(current))
+    return segments, encode_type
+
+
+class SMSOutbox:
+    """Persistent queue of messages to send, drained at a limited rate.
+
+    Every recipient of a message is a separate queue item. Items are sent
+    one at a time on the API session, long texts are split into several
+    SMS. Failed sends are retried with exponential backoff. The result of
+    every item is fired as a delivery event.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, api: API, hostname: str, send_interval: float) -> None:
+        self._hass = hass
+        self._api = api
+        self._hostname = hostname
+        self._send_interval = send_interval
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.sms_outbox")
+        self._queue: list[dict] = []
+        self._wakeup = asyncio.Event()
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if data is not None:
+            self._queue = data['queue']
+
+    def _data_to_save(self) -> dict:
+        return {"queue": self._queue}
+
+    def _save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, 1)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, numbers: list[str], text: str) -> list[str]:
+        """Queue the text for every number and return the ids of the queued items."""
+        segments, encode_type = split_message(text)
+        ids = []
+        for number in numbers:
+            item = {
+                "id": uuid4().hex,
+                "number": number,
+                "segments": segments,
+                "encode_type": encode_type,
+                # segments already sent, a retry continues after them
+                "sent": 0,
+                "attempts": 0,
+                "next_try": 0,
+            }
+            self._queue.append(item)
+            ids.append(item['id'])
+        self._save()
+        self._wakeup.set()
+        return ids
+
+    async def async_run(self) -> None:
+        """Send queued messages until cancelled."""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            item = min(self._queue, key=lambda item: item['next_try'])
+            delay = item['next_try'] - time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+            await self._async_send(item)
+            await asyncio.sleep(self._send_interval)
+
+    async def _async_send(self, item: dict) -> None:
+        item['attempts'] += 1
+        try:
+            while item['sent'] < len(item['segments']):
+                await self._api.sendSMSMessage(item['number'], item['segments'][item['sent']], encode_type=item['encode_type'])
+                item['sent'] += 1
+                self._save()
+                if item['sent'] < len(item['segments']):
+                    await asyncio.sleep(self._send_interval)
+        except (APIAuthError, APIConnectionError, ClientError, TimeoutError) as err:
+            if item['attempts'] < SMS_SEND_ATTEMPTS:
+                item['next_try'] = time() + SMS_RETRY_BACKOFF * 2 ** (item['attempts'] - 1)
+                _LOGGER.warning("Sending SMS to %s failed, retrying: %s", item['number'], err)
+                self._save()
+                return
+            _LOGGER.error("Sending SMS to %s failed: %s", item['number'], err)
+            self._finish(item, "failed", str(err))
+            return
+        except Exception as err:
+            # not a problem a retry would fix, report it and keep the queue draining
+            _LOGGER.exception("Unexpected error sending SMS to %s", item['number'])
+            self._finish(item, "failed", str(err))
+            return
+        self._finish(item, "sent")
+
+    def _finish(self, item: dict, status: str, error: str = None) -> None:
+        self._queue.remove(item)
+        self._save()
+        self._hass.bus.async_fire(EVENT_SMS_DELIVERY, {
+            "host": self._hostname,
+            "id": item['id'],
+            "number": item['number'],
+            "status": status,
+            "segments": len(item['segments']),
+            "attempts": item['attempts'],
+            "error": error,
+        })
@@ -0,0 +1,93 @@
+from collections.abc import Iterable
+
+# value of a field the router did not return
+MISSING = object()
+
+
+def _coerce_number(value):
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return float(value)
+
+
+class SnapshotField:
+    """A value entities read, where to find it and how to convert it."""
+
+    __slots__ = ("endpoint_key", "data_key", "conversion_rate", "numeric")
+
+    def __init__(self, endpoint_key: str, data_key: str, conversion_rate: float = None, numeric: bool = False) -> None:
+        self.endpoint_key = endpoint_key
+        self.data_key = data_key
+        self.conversion_rate = conversion_rate
+        self.numeric = numeric
+
+    def convert(self, data) -> any:
+        """Return the converted value, MISSING if absent, None if it cannot be converted."""
+        if not isinstance(data, dict) or self.data_key not in data:
+            return MISSING
+        value = data[self.data_key]
+        try:
+            if self.conversion_rate is not None:
+                return float(value) / self.conversion_rate
+            if self.numeric:
+                return _coerce_number(value)
+        except (TypeError, ValueError):
+            return None
+        return value
+
+
+class Snapshot:
+    """Converted values of one poll, each at the index of its field in the schema."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: list) -> None:
+        self.values = values
+
+    def __getitem__(self, index: int):
+        return self.values[index]
+
+
+class SnapshotSchema:
+    """Fields that entities read, in the order of their index in every snapshot."""
+
+    def __init__(self) -> None:
+        self._fields: list[SnapshotField] = []
+        self._indexes: dict[tuple, int] = {}
+        # indexes of the fields of each endpoint, so a poll only converts what it fetched
+        self._by_endpoint: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def add(self, endpoint_key: str, data_key: str, conversion_rate: float = None, numeric: bool = False) -> int:
+        """Add a field if it is not there yet and return its index."""
+        key = (endpoint_key, data_key, conversion_rate, numeric)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = len(self._fields)
+            self._fields.append(SnapshotField(endpoint_key, data_key, conversion_rate, numeric))
+            self._by_endpoint.setdefault(endpoint_key, []).append(index)
+        return index
+
+    def field(self, index: int) -> SnapshotField:
+        return self._fields[index]
+
+    def build(self, endpoints: dict[str, dict], updated: Iterable[str], previous: Snapshot = None) -> Snapshot:
+        """Return a snapshot with the fields of the updated endpoints converted anew.
+
+        Fields of the other endpoints keep their value from the previous snapshot.
+        """
+        if previous is None:
+            values = [MISSING] * len(self._fields)
+            updated = self._by_endpoint
+        else:
+            values = list(previous.values)
+        for endpoint_key in updated:
+            data = endpoints.get(endpoint_key)
+            for index in self._by_endpoint.get(endpoint_key, ()):
+                values[index] = self._fields[index].convert(data)
+        return Snapshot(values)
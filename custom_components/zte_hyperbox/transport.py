@@ -0,0 +1,80 @@
+from aiohttp import ClientSession, TCPConnector
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .const import DOMAIN
+from .pipeline import RequestGate
+
+DATA_TRANSPORT = f"{DOMAIN}_transport"
+
+# requests sent to all routers at the same time
+MAX_GLOBAL_REQUESTS = 8
+# connections kept open to one router, matches the requests an API sends at once
+MAX_HOST_CONNECTIONS = 3
+# seconds an idle connection is kept, below the keep-alive timeout of the router's web server
+KEEPALIVE_TIMEOUT = 15
+# fractional part of the golden ratio, spreads any number of hosts evenly over an interval
+_GOLDEN_FRACTION = 0.6180339887498949
+
+
+class HyperboxTransport:
+    """Connection pool and request limit shared by all routers of the integration.
+
+    Every router gets a few keep-alive connections from one connector, so
+    polls reuse their sockets instead of opening new ones. Requests to all
+    routers together pass one gate, and each router gets a fixed offset
+    into the polling interval so the routers are not polled in one burst.
+    """
+
+    def __init__(self) -> None:
+        self.session = ClientSession(
+            connector=TCPConnector(
+                limit=MAX_GLOBAL_REQUESTS,
+                limit_per_host=MAX_HOST_CONNECTIONS,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+        )
+        self.gate = RequestGate(MAX_GLOBAL_REQUESTS)
+        # hosts using the transport, by the slot their poll offset is taken from
+        self._slots: dict[str, int] = {}
+
+    def register(self, hostname: str) -> None:
+        if hostname in self._slots:
+            return
+        free = set(range(len(self._slots) + 1)) - set(self._slots.values())
+        self._slots[hostname] = min(free)
+
+    def unregister(self, hostname: str) -> bool:
+        """Stop using the transport for a host and return whether no host is left."""
+        self._slots.pop(hostname, None)
+        return not self._slots
+
+    def poll_offset(self, hostname: str, interval: float) -> float:
+        """Return the seconds a host's polls are shifted by within the interval."""
+        slot = self._slots.get(hostname, 0)
+        return (slot * _GOLDEN_FRACTION) % 1 * interval
+
+    async def async_close(self) -> None:
+        await self.session.close()
+
+
+@callback
+def async_get_transport(hass: HomeAssistant) -> HyperboxTransport:
+    """Return the transport of the integration, creating it on first use."""
+    transport = hass.data.get(DATA_TRANSPORT)
+    if transport is None:
+        transport = hass.data[DATA_TRANSPORT] = HyperboxTransport()
+
+        async def _async_close(event: Event) -> None:
+            await transport.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return transport
+
+
+async def async_release_transport(hass: HomeAssistant, hostname: str) -> None:
+    """Release a host's use of the transport, closing it when no host is left."""
+    transport = hass.data.get(DATA_TRANSPORT)
+    if transport is not None and transport.unregister(hostname):
+        hass.data.pop(DATA_TRANSPORT)
+        await transport.async_close()
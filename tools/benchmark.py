@@ -0,0 +1,256 @@
+"""Benchmark the poll path of the integration against the router simulator.
+
+Measures, per poll of HyperboxCoordinator.async_update_data: wall-clock
+duration, HTTP round trips, ubus calls, bytes sent and received, and the
+CPU time spent decoding SMS messages.
+
+    python -m tools.benchmark --polls 50 --inbox-size 500 --latency 0.05
+    python -m tools.benchmark --json results.json
+    python -m tools.benchmark --compare results.json
+    python -m tools.benchmark --codec
+    python -m tools.benchmark --replay zte_hyperbox_capture_192_168_0_1_1760000000.json.gz
+
+With --codec, compares the CPU time of encoding a poll batch that lists the
+whole inbox, every SMS page, and decoding its response with the stdlib json
+module and with the serialized call templates and orjson helpers the API uses.
+
+With --replay, the polls are answered from a file written by the
+capture_traffic service instead of the simulator, at full speed.
+
+With --compare, the run fails if a scenario got slower or needs more
+round trips or bytes than the saved results allow.
+"""
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import logging
+from statistics import median, quantiles
+import sys
+import tempfile
+from time import perf_counter, process_time
+from types import SimpleNamespace
+
+from aiohttp import ClientSession
+from homeassistant.const import CONF_HOST, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.util.json import json_loads
+
+from custom_components.zte_hyperbox.api import API, POLL_CALLS, SMS_PAGE_SIZE, _smsPageCall
+from custom_components.zte_hyperbox.capture import ReplaySession, load_capture
+from custom_components.zte_hyperbox.coordinator import HyperboxCoordinator
+
+from .router_simulator import RouterSimulator, SimulatorConfig
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    polls: int
+    duration_p50_ms: float
+    duration_p95_ms: float
+    requests_per_poll: float
+    calls_per_poll: float
+    logins_per_poll: float
+    bytes_sent_per_poll: float
+    bytes_received_per_poll: float
+    sms_decode_cpu_ms_per_poll: float
+
+
+class _DecodeTimer:
+    """Wraps API._cacheSMSMessage to add up the CPU time spent decoding messages."""
+
+    def __init__(self, api) -> None:
+        self.cpu = 0.0
+        self._cache_message = api._cacheSMSMessage
+        api._cacheSMSMessage = self
+
+    def __call__(self, message):
+        start = process_time()
+        try:
+            return self._cache_message(message)
+        finally:
+            self.cpu += process_time() - start
+
+
+async def _run_scenario(name: str, coordinator: HyperboxCoordinator, simulator: RouterSimulator, polls: int, before_poll=None) -> ScenarioResult:
+    timer = _DecodeTimer(coordinator.api)
+    simulator.reset_counters()
+    durations = []
+    for _ in range(polls):
+        if before_poll is not None:
+            before_poll()
+        # fetch every endpoint on each poll, whatever its interval
+        coordinator._last_fetch.clear()
+        start = perf_counter()
+        coordinator.data = await coordinator.async_update_data()
+        durations.append((perf_counter() - start) * 1000)
+    coordinator.api._cacheSMSMessage = timer._cache_message
+    return ScenarioResult(
+        name=name,
+        polls=polls,
+        duration_p50_ms=round(median(durations), 2),
+        duration_p95_ms=round(quantiles(durations, n=20)[-1] if polls > 1 else durations[0], 2),
+        requests_per_poll=simulator.requests / polls,
+        calls_per_poll=simulator.calls / polls,
+        logins_per_poll=simulator.logins / polls,
+        bytes_sent_per_poll=simulator.bytes_received / polls,
+        bytes_received_per_poll=simulator.bytes_sent / polls,
+        sms_decode_cpu_ms_per_poll=round(timer.cpu * 1000 / polls, 3),
+    )
+
+
+async def run(args) -> list[ScenarioResult]:
+    simulator = RouterSimulator(SimulatorConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        inbox_size=args.inbox_size,
+    ))
+    host = await simulator.start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        entry = SimpleNamespace(
+            entry_id="benchmark",
+            unique_id=host,
+            data={CONF_HOST: host, CONF_PASSWORD: simulator.config.password},
+            options={},
+        )
+        coordinator = HyperboxCoordinator(hass, entry)
+        results = [
+            await _run_scenario("cold start", coordinator, simulator, 1),
+            await _run_scenario("steady state", coordinator, simulator, args.polls),
+            await _run_scenario("session expired", coordinator, simulator, args.polls, simulator.expire_sessions),
+        ]
+
+        def receive_message():
+            simulator.add_message("+4915112345678", "New message while benchmarking.")
+
+        results.append(await _run_scenario("new sms every poll", coordinator, simulator, args.polls, receive_message))
+        await hass.async_stop(force=True)
+    await simulator.stop()
+    return results
+
+
+async def run_replay(args) -> list[ScenarioResult]:
+    replay = ReplaySession(load_capture(args.replay))
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        entry = SimpleNamespace(
+            entry_id="benchmark",
+            unique_id="replay",
+            data={CONF_HOST: "replay", CONF_PASSWORD: "replay"},
+            options={},
+        )
+        coordinator = HyperboxCoordinator(hass, entry)
+        coordinator.api._session = replay
+        results = [
+            await _run_scenario("replay cold start", coordinator, replay, 1),
+            await _run_scenario("replay steady state", coordinator, replay, args.polls),
+        ]
+        await hass.async_stop(force=True)
+    return results
+
+
+def _stdlib_encode(calls, session: str) -> bytes:
+    """Encode a batch the way the API did before it used templates."""
+    return json.dumps([
+        {"jsonrpc": "2.0", "id": index, "method": "call", "params": [session, endpoint, method, params]}
+        for index, (endpoint, method, params) in enumerate(calls)
+    ]).encode()
+
+
+def _cpu_ms(function, repeat: int) -> float:
+    start = process_time()
+    for _ in range(repeat):
+        function()
+    return (process_time() - start) * 1000 / repeat
+
+
+async def run_codec(args) -> dict[str, float]:
+    """Return the CPU milliseconds per full inbox poll spent encoding and decoding, stdlib against fast path."""
+    simulator = RouterSimulator(SimulatorConfig(inbox_size=args.inbox_size))
+    host = await simulator.start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        async with ClientSession() as session:
+            api = API(hass, host, simulator.config.password, session=session)
+            await api.login()
+            # the poll calls and the further SMS pages of a full sync, so the whole inbox is in the response
+            pages = -(-args.inbox_size // SMS_PAGE_SIZE)
+            calls = [*POLL_CALLS.values(), *(_smsPageCall(page) for page in range(1, pages))]
+            data, _ = api._encodeBatch(calls, api._ubus_rpc_session)
+            async with session.post(f"http://{host}/ubus/", data=data) as response:
+                body = await response.read()
+        await hass.async_stop(force=True)
+    await simulator.stop()
+
+    repeat = max(args.polls, 200)
+    results = {
+        "encode_stdlib_ms": _cpu_ms(lambda: _stdlib_encode(calls, api._ubus_rpc_session), repeat),
+        "encode_fast_ms": _cpu_ms(lambda: api._encodeBatch(calls, api._ubus_rpc_session), repeat),
+        "decode_stdlib_ms": _cpu_ms(lambda: json.loads(body), repeat),
+        "decode_fast_ms": _cpu_ms(lambda: json_loads(body), repeat),
+    }
+    results["saved_ms_per_poll"] = (
+        results["encode_stdlib_ms"] + results["decode_stdlib_ms"]
+        - results["encode_fast_ms"] - results["decode_fast_ms"]
+    )
+    results["response_bytes"] = len(body)
+    results["sms_pages"] = max(pages, 1)
+    return {key: round(value, 4) for key, value in results.items()}
+
+
+def _compare(results: list[ScenarioResult], baseline_path: str, tolerance: float) -> list[str]:
+    with open(baseline_path) as file:
+        baseline = {result["name"]: result for result in json.load(file)}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            continue
+        for metric in ("duration_p50_ms", "requests_per_poll", "calls_per_poll", "bytes_received_per_poll", "sms_decode_cpu_ms_per_poll"):
+            before = previous[metric]
+            after = getattr(result, metric)
+            if after > before * (1 + tolerance) and after - before > 0.01:
+                regressions.append(f"{result.name}: {metric} {before} -> {after}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the zte_hyperbox poll path.")
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--inbox-size", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per HTTP request")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="fail if results regressed against this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--codec", action="store_true", help="only compare JSON encoding and decoding")
+    parser.add_argument("--replay", help="answer the polls from this capture file instead of the simulator")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.codec:
+        for key, value in asyncio.run(run_codec(args)).items():
+            print(f"{key}: {value}")
+        return 0
+    results = asyncio.run(run_replay(args) if args.replay else run(args))
+
+    columns = list(asdict(results[0]))
+    print(" | ".join(columns))
+    for result in results:
+        print(" | ".join(str(value) for value in asdict(result).values()))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump([asdict(result) for result in results], file, indent=2)
+    if args.compare:
+        regressions = _compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Local stand-in for the /ubus/ endpoint of a ZTE Hyperbox.
+
+Implements the ubus calls used by the integration, so API and
+HyperboxCoordinator can be exercised without a real router. Latency, error
+rate, session expiry and inbox size are configurable.
+
+Run standalone to point a development Home Assistant instance at it:
+
+    python -m tools.router_simulator --port 8080 --inbox-size 300
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import hashlib
+import json
+import random
+import secrets
+from time import monotonic
+
+from aiohttp import web
+
+SALT = "a1b2c3d4"
+# ubus status codes
+UBUS_STATUS_OK = 0
+UBUS_STATUS_NOT_FOUND = 4
+UBUS_STATUS_UNKNOWN_ERROR = 9
+
+
+@dataclass
+class SimulatorConfig:
+    password: str = "admin"
+    # seconds added to every HTTP request
+    latency: float = 0.0
+    # probability that a single call fails with an ubus error
+    error_rate: float = 0.0
+    # seconds of inactivity after which a session is no longer accepted
+    session_lifetime: float = 300.0
+    # received messages in the inbox at start
+    inbox_size: int = 20
+    # seconds the router drops every connection after a reboot
+    reboot_duration: float = 0.0
+    seed: int = 0
+
+
+class RouterSimulator:
+    """aiohttp application answering JSON-RPC batches like the router does."""
+
+    def __init__(self, config: SimulatorConfig = None) -> None:
+        self.config = config or SimulatorConfig()
+        self._random = random.Random(self.config.seed)
+        # session id -> monotonic time of last use
+        self._sessions: dict[str, float] = {}
+        self._messages: list[dict] = []
+        self._next_sms_id = 1
+        for index in range(self.config.inbox_size):
+            self.add_message("+4915112345678", f"Test message {index} from the simulator.", tag="0")
+        self._started = monotonic()
+        self._down_until = 0.0
+        self.reset_counters()
+
+        self.app = web.Application()
+        self.app.router.add_post("/ubus/", self._handle)
+        self._handlers = {
+            ("zwrt_web", "web_login_info"): self._web_login_info,
+            ("zwrt_web", "web_login"): self._web_login,
+            ("zwrt_data", "get_wwandst"): self._get_wwandst,
+            ("zte_nwinfo_api", "nwinfo_get_netinfo"): self._nwinfo_get_netinfo,
+            ("zwrt_wms", "zte_libwms_get_sms_data"): self._get_sms_data,
+            ("zwrt_wms", "zte_libwms_send_sms"): self._send_sms,
+            ("zwrt_wms", "zte_libwms_delete_sms"): self._delete_sms,
+            ("zwrt_wms", "zte_libwms_set_msg_read"): self._set_msg_read,
+            ("zwrt_mc.device.manager", "device_reboot"): self._device_reboot,
+        }
+        self._runner: web.AppRunner = None
+        self.host: str = None
+
+    def reset_counters(self) -> None:
+        self.requests = 0
+        self.calls = 0
+        self.logins = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    def expire_sessions(self) -> None:
+        self._sessions.clear()
+
+    def add_message(self, number: str, content: str, tag: str = "1") -> dict:
+        now = datetime.now().astimezone()
+        offset = int(now.utcoffset() / timedelta(hours=1))
+        message = {
+            "id": str(self._next_sms_id),
+            "number": number,
+            "content": content.encode("utf-16-be").hex().upper(),
+            "date": now.strftime("%y,%m,%d,%H,%M,%S,") + f"{offset:+d}",
+            "tag": tag,
+        }
+        self._next_sms_id += 1
+        self._messages.append(message)
+        return message
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the host:port to hand to API."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.host = f"{host}:{port}"
+        return self.host
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if monotonic() < self._down_until:
+            # rebooting, the client sees the connection drop
+            request.transport.abort()
+            return web.Response()
+        body = await request.read()
+        self.requests += 1
+        self.bytes_received += len(body)
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        calls = json.loads(body)
+        response = [self._dispatch(call) for call in calls]
+        data = json.dumps(response).encode()
+        self.bytes_sent += len(data)
+        return web.Response(body=data, content_type="application/json")
+
+    def _dispatch(self, call: dict) -> dict:
+        self.calls += 1
+        session, endpoint, method, params = call["params"]
+        reply = {"jsonrpc": "2.0", "id": call["id"]}
+        handler = self._handlers.get((endpoint, method))
+        if handler is None:
+            reply["result"] = [UBUS_STATUS_NOT_FOUND]
+            return reply
+        if endpoint != "zwrt_web" and not self._session_valid(session):
+            reply["error"] = {"code": -32002, "message": "Access denied"}
+            return reply
+        if self.config.error_rate and self._random.random() < self.config.error_rate:
+            reply["result"] = [UBUS_STATUS_UNKNOWN_ERROR]
+            return reply
+        result = handler(params)
+        reply["result"] = [UBUS_STATUS_OK] if result is None else [UBUS_STATUS_OK, result]
+        return reply
+
+    def _session_valid(self, session: str) -> bool:
+        last_used = self._sessions.get(session)
+        now = monotonic()
+        if last_used is None or now - last_used > self.config.session_lifetime:
+            self._sessions.pop(session, None)
+            return False
+        self._sessions[session] = now
+        return True
+
+    def _web_login_info(self, params: dict) -> dict:
+        return {"zte_web_sault": SALT}
+
+    def _web_login(self, params: dict) -> dict:
+        hashed = hashlib.sha256(self.config.password.encode()).hexdigest().upper()
+        expected = hashlib.sha256((hashed + SALT).encode()).hexdigest().upper()
+        if params.get("password") != expected:
+            return {"result": 1, "msg": "wrong password"}
+        self.logins += 1
+        session = secrets.token_hex(16)
+        self._sessions[session] = monotonic()
+        return {"result": 0, "ubus_rpc_session": session}
+
+    def _get_wwandst(self, params: dict) -> dict:
+        uptime = int(monotonic() - self._started)
+        rx_speed = self._random.randint(100_000, 12_000_000)
+        tx_speed = self._random.randint(10_000, 2_000_000)
+        data = {
+            "cid": params.get("cid", 1),
+            "real_time": uptime,
+            "real_tx_speed": tx_speed,
+            "real_rx_speed": rx_speed,
+            "real_max_tx_speed": 2_000_000,
+            "real_max_rx_speed": 12_000_000,
+        }
+        for prefix, scale in (("real", 1), ("month", 40), ("total", 400)):
+            data[f"{prefix}_tx_bytes"] = uptime * 50_000 * scale
+            data[f"{prefix}_rx_bytes"] = uptime * 900_000 * scale
+            data[f"{prefix}_tx_packets"] = uptime * 40 * scale
+            data[f"{prefix}_rx_packets"] = uptime * 700 * scale
+            for kind in ("drop", "error"):
+                data[f"{prefix}_tx_{kind}_packets"] = scale
+                data[f"{prefix}_rx_{kind}_packets"] = 2 * scale
+        return data
+
+    def _nwinfo_get_netinfo(self, params: dict) -> dict:
+        jitter = self._random.randint
+        return {
+            "network_type": "ENDC",
+            "domain_stat": "CS_PS",
+            "net_select": "Only_5G_NSA_LTE",
+            "net_select_mode": "auto_select",
+            "signalbar": 4,
+            "lte_rsrp": -95 + jitter(-3, 3),
+            "lte_rsrq": -10 + jitter(-2, 2),
+            "lte_rssi": -65 + jitter(-3, 3),
+            "lte_snr": 12 + jitter(-2, 2),
+            "nr5g_rsrp": -100 + jitter(-3, 3),
+            "nr5g_rsrq": -11 + jitter(-2, 2),
+            "nr5g_snr": 15 + jitter(-2, 2),
+            "nr5g_rssi": -70 + jitter(-3, 3),
+            "rmcc": "262",
+            "rmnc": "01",
+            "network_provider": "Telekom.de",
+            "network_provider_fullname": "Telekom.de",
+            "cell_id": "1A2B3C4",
+            "lte_pci": "201",
+            "wan_active_band": "LTE BAND 3",
+            "wan_active_channel": "1300",
+            "nr5g_cell_id": "5A6B7C8D9",
+            "nr5g_pci": "402",
+            "nr5g_action_channel": "643296",
+            "nr5g_action_band": "n78",
+            "nr5g_bandwidth": "90",
+            "ltecasig": f"1,-98,10;3,{-101 + jitter(-3, 3)},8;",
+            "lteca": "1,1,300,20,201;3,7,3050,20,133;",
+            "lteca_state": 1,
+            "nrca": f"1,n28,152690,10,403,{-104 + jitter(-3, 3)},9;",
+            "lock_lte_cell": "",
+            "lock_nr_cell": "",
+            "lte_band_lock": "0xA0800D5",
+            "gw_band_lock": "",
+            "nr5g_sa_band_lock": "1,3,7,8,20,28,38,40,41,75,77,78",
+            "nitz_timezone": "+1",
+            "nitz_sync_flag": 1,
+            "simcard_roam": "Home",
+        }
+
+    def _get_sms_data(self, params: dict) -> dict:
+        messages = self._messages
+        tags = params.get("tags", 10)
+        if tags != 10:
+            messages = [message for message in messages if message["tag"] == str(tags)]
+        if "desc" in params.get("order_by", ""):
+            messages = sorted(messages, key=lambda message: int(message["id"]), reverse=True)
+        page = params.get("page", 0)
+        per_page = params.get("data_per_page", 500)
+        return {"messages": messages[page * per_page:(page + 1) * per_page]}
+
+    def _send_sms(self, params: dict) -> None:
+        message = self.add_message(params["number"], "", tag="2")
+        message["content"] = params["message_body"]
+
+    def _delete_sms(self, params: dict) -> None:
+        ids = set(params["id"].split(";"))
+        self._messages = [message for message in self._messages if message["id"] not in ids]
+
+    def _set_msg_read(self, params: dict) -> None:
+        ids = set(params["id"].split(";"))
+        for message in self._messages:
+            if message["id"] in ids and message["tag"] == "1":
+                message["tag"] = str(params["tag"])
+
+    def _device_reboot(self, params: dict) -> None:
+        self._sessions.clear()
+        self._started = monotonic()
+        self._down_until = self._started + self.config.reboot_duration
+
+
+async def _main(args) -> None:
+    simulator = RouterSimulator(SimulatorConfig(
+        password=args.password,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        session_lifetime=args.session_lifetime,
+        inbox_size=args.inbox_size,
+        reboot_duration=args.reboot_duration,
+    ))
+    host = await simulator.start(args.bind, args.port)
+    print(f"Simulated router listening on http://{host}/ (password {args.password!r})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per HTTP request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability that a call fails")
+    parser.add_argument("--session-lifetime", type=float, default=300.0, help="idle seconds until a session expires")
+    parser.add_argument("--inbox-size", type=int, default=20, help="received messages in the inbox")
+    parser.add_argument("--reboot-duration", type=float, default=30.0, help="seconds the router is unreachable after a reboot")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(_parse_args()))
+    except KeyboardInterrupt:
+        pass